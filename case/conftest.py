@@ -0,0 +1 @@
+# makes grumpy_case importable when pytest is run from this directory
@@ -0,0 +1,39 @@
+""" parametric case generator for the grumpy keyboard
+
+Parameters and the switch layout are plain Python, the CAD kernel is only
+imported once a build function is used::
+
+    from grumpy_case import CHOC, build_case
+    case = build_case(CHOC.replace(handAngle=15))
+"""
+
+from .cache import BuildCache
+from .params import CHOC, LP, MX, PRESETS, CaseParams
+from .layout import (
+    Switch, getAllKeyPos, getAllKeyPosMir, getAlphaKeyPos, getRowPos,
+    getSwitches, getSwitchPositions, getThumbKeyPos,
+)
+from .profiling import Profiler, stage
+from .stages import STAGES, stage_keys
+
+# names resolved from .build on first use, so importing the package stays kernel free
+_BUILD_NAMES = (
+    "CaseBuild", "CaseSketches", "FullCase", "build_case", "build_sketches",
+    "build_bottom", "build_plate", "build_top", "build_half", "build_half_single", "build_full",
+    "build_bottom_plate", "StageRunner",
+)
+
+
+def __getattr__(name):
+    if name in _BUILD_NAMES:
+        from . import build
+        return getattr(build, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    "CaseParams", "MX", "LP", "CHOC", "PRESETS", "BuildCache", "STAGES", "stage_keys",
+    "Profiler", "stage",
+    "getRowPos", "getSwitchPositions", "getAlphaKeyPos", "getThumbKeyPos",
+    "getAllKeyPos", "getAllKeyPosMir", "Switch", "getSwitches",
+]
@@ -0,0 +1,255 @@
+""" builds many case variants in parallel
+
+A sweep spec is a JSON object::
+
+    {
+        "base": "choc",
+        "grid": {"keySafety": [0.5, 0.75], "handAngle": [14, 14.75]},
+        "variants": [{"hsSafety": 0.3}, {"hsSafety": 0.5}],
+        "formats": ["step", "stl:print"]
+    }
+
+``variants`` is a list of parameter sets, every one of them is combined with
+all points of ``grid``. Either of both may be left out. ``formats`` lists the
+outputs, STL may name a tessellation profile (``stl:draft``, ``stl:print``,
+``stl:cnc``, see export.PROFILES), ``png:<view>`` renders a thumbnail (see
+render.VIEWS). An optional ``"board"`` names a
+``.kicad_pcb`` file, every built case is then checked for clearance to its
+components (see interference.py).
+
+Usage: ``python -m grumpy_case.batch sweep.json -o out/``
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import as_completed
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .export import export_step, export_stl, parse_output
+from .mesh import export_stl_mirrored
+from .params import PRESETS, CaseParams
+from .validate import check
+from .workers import JobTimeout, WorkerDied, WorkerPool
+
+FORMATS = ("step", "stl")
+
+
+@dataclass
+class Job:
+    name: str
+    params: CaseParams
+    changes: dict = field(default_factory=dict)
+
+
+def expand_spec(spec):
+    """ expands a sweep spec into jobs
+
+    :param spec: dict as described in the module docstring
+    :return list of Job
+    """
+    base = spec.get("base", "mx")
+    base = PRESETS[base] if isinstance(base, str) else CaseParams.from_dict(base)
+    grid = spec.get("grid", {})
+    names = list(grid)
+    points = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+    jobs = {}
+    for variant in spec.get("variants", [{}]):
+        for point in points:
+            changes = {**variant, **point}
+            params = CaseParams.from_dict(changes, base)
+            digest = hashlib.sha1(json.dumps(params.to_dict(), sort_keys=True).encode()).hexdigest()
+            name = f"{params.name}-{digest[:10]}"
+            # identical parameter sets are only built once
+            jobs.setdefault(name, Job(name, params, changes))
+    return list(jobs.values())
+
+
+## ------------------------------------------------------------------------------
+
+# per worker state, every worker process keeps its own kernel and cache
+_cache = None
+
+
+def _init_worker(cachePath):
+    global _cache
+    # load the kernel once per worker instead of once per job
+    from . import build  # noqa: F401
+
+    if cachePath:
+        from .cache import BuildCache
+        _cache = BuildCache(cachePath)
+
+
+def export_parts(case, outDir, formats=FORMATS, mirrorStl=False, only=None):
+    """ writes the full case and the bottom plate
+
+    :param formats: output specs, "step", "stl" or "stl:<profile>" with a
+        tessellation profile of export.PROFILES, "png" or "png:<view>" for
+        thumbnails, see render.VIEWS
+    :param mirrorStl: mesh only the right half of the (symmetric) case and
+        mirror the triangles, see mesh.export_stl_mirrored
+    :param only: names of the parts to write ("case", "bottom"), default all
+    :return list of ExportReport dicts
+    """
+    outDir = Path(outDir)
+    outDir.mkdir(parents=True, exist_ok=True)
+    parts = {"case": case.full, "bottom": case.bottomPlate}
+    if only is not None:
+        parts = {name: part for name, part in parts.items() if name in only}
+    outputs = [parse_output(spec) for spec in formats]
+    reports = []
+    for name, part in parts.items():
+        if part is None:
+            continue
+        for fmt, profile in outputs:
+            # several profiles of one format get their own file names
+            suffix = f"-{profile}" if sum(f == fmt for f, _ in outputs) > 1 else ""
+            path = outDir / f"{name}{suffix}.{fmt}"
+            if fmt == "step":
+                report = export_step(part, path)
+            elif fmt == "png":
+                from .render import export_png
+                report = export_png(part, path, profile)
+            elif mirrorStl and name == "case":
+                report = export_stl_mirrored(part, path, profile)
+            else:
+                report = export_stl(part, path, profile)
+            reports.append(asdict(report))
+    return reports
+
+
+def _clearance(case, params, board):
+    """ smallest clearance to the board components and the overlapping ones """
+    from .interference import case_triangles, check as check_clearance
+
+    result = check_clearance(params, board, case_triangles(case))
+    smallest = min(c.clearance for c in result)
+    return {"smallest": smallest if smallest != float("inf") else None,
+            "overlaps": [f"{c.kind} {c.ref}" for c in result if c.overlap]}
+
+
+def _run_job(job, outDir, formats, mirrorStl=False, board=None):
+    """ worker entry point, never raises for build errors """
+    from .build import build_case
+
+    start = time.perf_counter()
+    result = {"name": job.name, "changes": job.changes}
+    try:
+        case = build_case(job.params, cache=_cache)
+        result["outputs"] = export_parts(case, Path(outDir) / job.name, formats, mirrorStl)
+        result["status"] = "ok"
+        if board:
+            result["clearance"] = _clearance(case, job.params, board)
+            if result["clearance"]["overlaps"]:
+                result["status"] = "interference"
+                result["error"] = "overlaps " + ", ".join(result["clearance"]["overlaps"])
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(jobs, outDir, formats=FORMATS, workers=None, timeout=600, cachePath=None,
+              mirrorStl=False, board=None):
+    """ builds all jobs in a process pool and writes manifest.json to outDir
+
+    A failing, timed out or infeasible (see validate.check) variant is recorded
+    in the manifest, the rest of the batch continues. The timeout is enforced
+    by the parent (see workers.WorkerPool): a worker stuck in the kernel or
+    dying with a kernel crash is replaced, only its variant is lost.
+
+    :param jobs: list of Job, see expand_spec
+    :param workers: number of worker processes, defaults to all cores
+    :param timeout: seconds per variant, 0 to disable
+    :param cachePath: optional BuildCache directory shared by all workers
+    :param mirrorStl: see export_parts
+    :param board: optional .kicad_pcb file, cases overlapping its components
+        get the status "interference"
+    :return list of result dicts in job order
+    """
+    outDir = Path(outDir)
+    outDir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count()
+    results = {}
+
+    # variants that can't be built never reach a worker
+    for job in jobs:
+        try:
+            reasons = check(job.params)
+        except (TypeError, ValueError) as e:
+            # e.g. a grid value of the wrong type
+            reasons = [f"invalid parameters: {e}"]
+        if reasons:
+            results[job.name] = {"name": job.name, "changes": job.changes, "status": "infeasible",
+                                 "error": "; ".join(reasons), "seconds": 0}
+    feasible = [job for job in jobs if job.name not in results]
+
+    with WorkerPool(workers, _init_worker, (cachePath,)) as pool:
+        futures = {pool.submit(_run_job, job, outDir, formats, mirrorStl, board, timeout=timeout or None): job
+                   for job in feasible}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                results[job.name] = future.result()
+            except JobTimeout:
+                results[job.name] = {"name": job.name, "changes": job.changes, "status": "timeout",
+                                     "error": f"build exceeded {timeout}s", "seconds": timeout}
+            except WorkerDied:
+                results[job.name] = {"name": job.name, "changes": job.changes,
+                                     "status": "crashed", "error": "worker process died"}
+
+    ordered = [results[job.name] for job in jobs]
+    manifest = {
+        "formats": list(formats),
+        "timeout": timeout,
+        "board": str(board) if board else None,
+        "variants": ordered,
+    }
+    (outDir / "manifest.json").write_text(json.dumps(manifest, indent=2, default=list))
+    return ordered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="build grumpy case variants from a sweep spec")
+    parser.add_argument("spec", help="sweep spec (json)")
+    parser.add_argument("-o", "--out", default="out", help="output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds per variant, 0 disables")
+    parser.add_argument("--format", nargs="+",
+                        help='export formats: step, stl or stl:<profile> (draft, print, cnc), '
+                             'png or png:<view> (iso, top, front, side)')
+    parser.add_argument("--cache", default=None, help="BuildCache directory shared by the workers")
+    parser.add_argument("--mirror-stl", action="store_true",
+                        help="mesh only one half of the case and mirror it for STL output")
+    parser.add_argument("--board", default=None,
+                        help=".kicad_pcb file to check the component clearance against")
+    args = parser.parse_args(argv)
+
+    spec = json.loads(Path(args.spec).read_text())
+    formats = args.format or spec.get("formats", ["step"])
+    for fmt in formats:
+        try:
+            parse_output(fmt)
+        except ValueError as e:
+            parser.error(str(e))
+    jobs = expand_spec(spec)
+    results = run_batch(jobs, args.out, formats, args.jobs, args.timeout, args.cache,
+                        args.mirror_stl, args.board or spec.get("board"))
+    failed = [r for r in results if r["status"] != "ok"]
+    for r in failed:
+        print(f"{r['name']}: {r['status']} {r.get('error', '')}")
+    print(f"{len(results) - len(failed)}/{len(results)} variants built, manifest in {args.out}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,180 @@
+""" end to end benchmark of the case generators
+
+Every variant is built and exported ``--repeat`` times, each run in a fresh
+process so peak memory and kernel state do not leak between runs. Medians are
+compared against a baseline file, the run fails if a variant got slower than
+``--threshold`` times its baseline.
+
+Usage::
+
+    python -m grumpy_case.bench --update          # record baselines
+    python -m grumpy_case.bench --threshold 1.25  # compare against them
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import runpy
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = CASE_DIR / "benchmarks.json"
+
+# variant name -> preset for build_case, or script path for the cadquery generator
+VARIANTS = {
+    "mx-cadquery": "grumpy_case_cadquery.py",
+    "mx-build123d": "mx",
+    "lp": "lp",
+    "choc": "choc",
+}
+METRICS = ("build", "export", "peakRss")
+
+
+def _build_cadquery(script):
+    # the script imports grumpy_case from its own folder and expects the cq-editor globals
+    if str(CASE_DIR) not in sys.path:
+        sys.path.insert(0, str(CASE_DIR))
+    result = runpy.run_path(str(CASE_DIR / script), init_globals={"show_object": lambda *a, **k: None})
+    return [result["full"]]
+
+
+def _export_cadquery(parts, outDir):
+    from cadquery import exporters
+
+    for i, part in enumerate(parts):
+        exporters.export(part, str(outDir / f"part{i}.step"))
+        exporters.export(part, str(outDir / f"part{i}.stl"))
+
+
+def _build_preset(preset):
+    from .build import build_case
+    from .params import PRESETS
+
+    case = build_case(PRESETS[preset])
+    return [p for p in (case.full, case.bottomPlate) if p is not None]
+
+
+def _export_build123d(parts, outDir):
+    from .export import export_step, export_stl
+
+    for i, part in enumerate(parts):
+        export_step(part, outDir / f"part{i}.step")
+        export_stl(part, outDir / f"part{i}.stl")
+
+
+def _run_once(variant):
+    """ builds and exports one variant, runs in a fresh worker process """
+    target = VARIANTS[variant]
+    isCadquery = target.endswith(".py")
+    # kernel import is not part of the measured build time
+    if isCadquery:
+        import cadquery  # noqa: F401
+    else:
+        from . import build  # noqa: F401
+
+    start = time.perf_counter()
+    parts = _build_cadquery(target) if isCadquery else _build_preset(target)
+    build = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        if isCadquery:
+            _export_cadquery(parts, Path(tmp))
+        else:
+            _export_build123d(parts, Path(tmp))
+        export = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    return {"build": build, "export": export, "peakRss": peak}
+
+
+def run(variants, repeat=3):
+    """ benchmarks the given variants
+
+    :return dict variant -> dict metric -> median
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for variant in variants:
+        runs = []
+        for _ in range(repeat):
+            with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                runs.append(pool.submit(_run_once, variant).result())
+        results[variant] = {m: statistics.median(r[m] for r in runs) for m in METRICS}
+        results[variant]["runs"] = repeat
+    return results
+
+
+def compare(results, baseline, threshold=1.25, memThreshold=None):
+    """ checks results against baseline medians
+
+    :param threshold: allowed ratio of build and export time to the baseline
+    :param memThreshold: allowed ratio of peak memory, defaults to threshold
+    :return list of regression messages, empty if all variants pass
+    """
+    memThreshold = memThreshold or threshold
+    regressions = []
+    for variant, result in results.items():
+        base = baseline.get(variant)
+        if base is None:
+            continue
+        for metric in METRICS:
+            if not base.get(metric):
+                continue
+            ratio = result[metric] / base[metric]
+            limit = memThreshold if metric == "peakRss" else threshold
+            if ratio > limit:
+                regressions.append(f"{variant} {metric}: {result[metric]:.3f} vs baseline "
+                                   f"{base[metric]:.3f} ({ratio:.2f}x > {limit:.2f}x)")
+    return regressions
+
+
+def _format(results, baseline):
+    lines = [f"{'variant':<14} {'build':>9} {'export':>9} {'peak RSS':>10}  vs baseline"]
+    for variant, r in results.items():
+        base = baseline.get(variant, {})
+        ratios = " ".join(f"{m} {r[m] / base[m]:.2f}x" for m in METRICS if base.get(m))
+        lines.append(f"{variant:<14} {r['build']:8.2f}s {r['export']:8.2f}s "
+                     f"{r['peakRss'] / 2**20:8.0f}MB  {ratios}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="benchmark the grumpy case generators")
+    parser.add_argument("variants", nargs="*", help=f"variants to run, default all of {', '.join(VARIANTS)}")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="runs per variant")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file")
+    parser.add_argument("--threshold", type=float, default=1.25, help="allowed slowdown ratio")
+    parser.add_argument("--mem-threshold", type=float, default=None, help="allowed memory ratio")
+    parser.add_argument("--update", action="store_true", help="store the results as new baseline")
+    args = parser.parse_args(argv)
+    unknown = set(args.variants) - set(VARIANTS)
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(sorted(unknown))}")
+
+    baselinePath = Path(args.baseline)
+    baseline = json.loads(baselinePath.read_text()) if baselinePath.exists() else {}
+    results = run(args.variants or list(VARIANTS), args.repeat)
+    print(_format(results, baseline))
+
+    if args.update:
+        baseline.update(results)
+        baselinePath.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"baseline written to {baselinePath}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold, args.mem_threshold)
+    for msg in regressions:
+        print(f"REGRESSION {msg}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
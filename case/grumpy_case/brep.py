@@ -0,0 +1,95 @@
+""" binary BREP (de)serialization of build123d shapes """
+
+import glob
+import hashlib
+import os
+import tempfile
+from importlib import metadata
+from pathlib import Path
+
+
+def kernel_version():
+    """ version string of the CAD libraries, used to invalidate cached geometry """
+    versions = []
+    for dist in ("build123d", "cadquery-ocp"):
+        try:
+            versions.append(f"{dist}={metadata.version(dist)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{dist}=none")
+    return ";".join(versions)
+
+
+def write_brep(shape, path):
+    """ writes shape in the kernels native binary BREP format """
+    from OCP.BinTools import BinTools
+
+    BinTools.Write_s(shape.wrapped, str(path))
+
+
+def read_brep(path):
+    """ reads a binary BREP file
+
+    :return build123d Shape of the stored type
+    """
+    from OCP.BinTools import BinTools
+    from OCP.TopoDS import TopoDS_Shape
+    from build123d import Shape
+
+    shape = TopoDS_Shape()
+    BinTools.Read_s(shape, str(path))
+    return Shape.cast(shape)
+
+
+def step_key(path):
+    """ sidecar key of a STEP file, its content hash salted with the kernel version """
+    digest = hashlib.sha256(kernel_version().encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def sidecar_path(path, key=None):
+    """ binary BREP file next to a STEP file, ``.<name>.<key>.brep`` """
+    path = Path(path)
+    return path.with_name(f".{path.name}.{key or step_key(path)}.brep")
+
+
+def load_step(path, sidecar=True):
+    """ reads a STEP file through a binary BREP sidecar
+
+    The STEP reader only runs when the file content (or the kernel) changed,
+    afterwards the sidecar is read directly. Sidecars of older contents are
+    removed, a read only folder just means reading the STEP every time.
+
+    :return build123d Shape
+    """
+    from build123d import import_step
+
+    path = Path(path)
+    if not sidecar:
+        return import_step(str(path))
+    target = sidecar_path(path)
+    if target.exists():
+        try:
+            return read_brep(target)
+        except Exception:
+            # truncated or written by another kernel, rebuilt below
+            pass
+
+    shape = import_step(str(path))
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".brep")
+    except OSError:
+        return shape
+    os.close(fd)
+    try:
+        write_brep(shape, tmp)
+        # rename is atomic, concurrent loaders write identical files
+        os.replace(tmp, target)
+        for old in path.parent.glob(f".{glob.escape(path.name)}.*.brep"):
+            if old != target:
+                old.unlink(missing_ok=True)
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+    return shape
@@ -0,0 +1,648 @@
+""" build123d pipeline for the grumpy case
+
+Every stage is a plain function of the parameters and the results of earlier
+stages, nothing is built on import. ``build_case`` runs all stages in order.
+"""
+
+import dataclasses
+from dataclasses import dataclass
+from typing import Any
+
+from build123d import (
+    Axis, BuildLine, BuildPart, BuildSketch, Circle, Compound, Face, Kind, Locations,
+    Mode, Plane, Rectangle, RectangleRounded, Select, SortBy,
+    add, chamfer, extrude, fillet, make_face, mirror, offset,
+)
+
+from .brep import kernel_version
+from .heal import unify
+from .layout import getAlphaKeyPos, getAllKeyPos, getAllKeyPosMir, getThumbKeyPos
+from .profiling import stage
+from .stages import dirty_stages, stage_inputs, stage_keys
+from .validate import validate
+
+
+@dataclass
+class CaseSketches:
+    outline: Any              # case outline of the right hand, only the outer corner filleted
+    keyCutout: Any
+    usbInner: Any
+    usbOuter: Any
+    profile: Any = None       # outline with the inner corners filleted as well
+    shell: Any = None         # inside of the bottom shell
+    bottomKeyCutout: Any = None
+    bottomKeyCutoutRot: Any = None
+
+
+@dataclass
+class FullCase:
+    part: Any
+    bottomWire: Any           # inner wires of the bottom face, outline of the bottom plate
+    insetFace: Any            # lowered middle face, outline of the bottom plate middle hole
+
+
+@dataclass
+class CaseBuild:
+    params: Any
+    bottom: Any
+    plate: Any
+    top: Any
+    half: Any
+    full: Any
+    bottomPlate: Any = None
+
+
+def _innerVertices(params, vertices):
+    """ sketch vertices of the vertical edges getInnerEdges selects """
+    return vertices.filter_by(lambda v: v.X > 2 and v.X < (params.caseWidth/2-20))
+
+
+def getInnerEdges(params, object):
+    obj = ( object.edges()
+           .filter_by(Axis.Z)
+           .filter_by(
+               lambda v: v.center().X > 2 and v.center().X < (params.caseWidth/2-20))
+           )
+    return obj
+
+
+def handPlane(params, z=0, mirrored=False):
+    """ work plane of the right (or mirrored left) hand at height z """
+    if mirrored:
+        return Plane(origin=(-params.partXOffset,0,z)).rotated((0,0,-params.handAngle))
+    return Plane(origin=(params.partXOffset,0,z)).rotated((0,0,params.handAngle))
+
+
+def _seamEdges(edges, lower, upper):
+    return edges.filter_by(
+        lambda v: (v.center().X < 0.05 and v.center().X > -0.05) and
+                  ((v.center().Y < upper and v.center().Y > lower) or v.center().Y > 7))
+
+def cut_batched(part, toolGroups):
+    """ subtracts all tools in a single fused boolean
+
+    Falls back to one boolean per group if the fused cut fails or returns an
+    invalid shape.
+
+    :param part: shape to cut
+    :param toolGroups: list of shapes, each holding one or more tool solids
+    :return resulting shape
+    """
+    tools = [solid for group in toolGroups for solid in group.solids()]
+    try:
+        result = part.cut(*tools)
+        if result.is_valid():
+            return result
+    except Exception:
+        pass
+    for group in toolGroups:
+        part = part.cut(*group.solids())
+    return part
+
+
+def _shellSketch(params, outline):
+    """ inside of the bottom shell, open towards the mirror plane """
+    with BuildSketch() as inner:
+        add(outline)
+        mirror(about=Plane.YZ)
+        offset(amount=-params.lWallWidth, kind=Kind.INTERSECTION)
+        with Locations((-params.caseWidth/2,0)):
+            Rectangle(params.caseWidth, params.caseHeight*2, mode=Mode.SUBTRACT)
+        if params.fillets:
+            fillet(_innerVertices(params, inner.vertices()), params.outerRadSmall)
+    return inner.sketch
+
+## ------------------------------------------------------------------------------
+
+def build_sketches(params):
+    """ creates all 2D sketches used by the case stages
+
+    :param params: CaseParams
+    :return CaseSketches
+    """
+    p = params
+    sx, sy = p.spacing_x, p.spacing_y
+
+    with BuildSketch() as SketchOutline:
+        # outline shapes for alpha and thumbs
+        with Locations(getAlphaKeyPos(p)):
+            Rectangle(sx+2*p.lWallWidth, sy+2*p.lWallWidth)
+        with Locations(getThumbKeyPos(p)):
+            Rectangle(sx*1.5+2*p.lWallWidth, sy+2*p.lWallWidth)
+        with Locations((p.caseWidth/4-7+5,-8)):
+            Rectangle(p.caseWidth/2+10, 2*sy+2*p.wallWidth+2.5+10, rotation=-p.handAngle)
+        with Locations(p.centerNotch):
+            Rectangle(40-p.lWallWidth, 46.9, mode=Mode.SUBTRACT)
+
+    with BuildSketch() as CaseOutline:
+        with Locations((p.partXOffset,0,0)):
+            add(SketchOutline.sketch, rotation=p.handAngle)
+        with Locations((-20,0)):
+            Rectangle(40,p.caseHeight*2, mode=Mode.SUBTRACT)
+
+    with BuildSketch() as CaseOutlineFilletOuter:
+        add(CaseOutline.sketch)
+        fillet(CaseOutlineFilletOuter.edges().sort_by(Axis.X)[-1].vertices(), p.outerRad)
+
+    # vertex fillets of the sketch instead of edge fillets of every band
+    with BuildSketch() as CaseProfile:
+        add(CaseOutlineFilletOuter.sketch)
+        if p.fillets:
+            fillet(_innerVertices(p, CaseProfile.vertices()), p.outerRadSmall)
+
+    with BuildSketch() as KeyCutout:
+        with Locations(getAlphaKeyPos(p)):
+            Rectangle(sx+p.keySafety, sy+p.keySafety)
+        with Locations(getThumbKeyPos(p)):
+            Rectangle(1.5*sx+p.keySafety, sy+p.keySafety)
+        fillet(KeyCutout.vertices().sort_by(Axis.X)[4:], 1)
+        fillet(KeyCutout.vertices().group_by(Axis.X)[0].sort_by(Axis.Y)[0], 1)
+        fillet(KeyCutout.vertices().group_by(Axis.X)[2].sort_by(Axis.Y)[0], 1)
+
+    with BuildSketch() as USBCutoutInner:
+        Rectangle(p.usbInnerSize[0], p.usbInnerSize[1]+p.usbStraightExtra)
+        fillet(USBCutoutInner.vertices(), p.usbInnerFillet)
+
+    with BuildSketch() as USBCutoutOuter:
+        with Locations((0,-1.5)):
+            Rectangle(*p.usbOuterSize)
+        fillet(USBCutoutOuter.vertices().group_by(Axis.Y)[-1], p.usbOuterFillet)
+
+    sketches = CaseSketches(
+        outline=CaseOutlineFilletOuter.sketch,
+        profile=CaseProfile.sketch,
+        shell=_shellSketch(p, CaseOutlineFilletOuter.sketch),
+        keyCutout=KeyCutout.sketch,
+        usbInner=USBCutoutInner.sketch,
+        usbOuter=USBCutoutOuter.sketch,
+    )
+
+    if p.bottomStyle == "plate":
+        # hotswap socket and switch pin cutouts of the bottom part
+        with BuildSketch() as BottomKeyCutout:
+            with Locations([(-5.5,0), (5.5,0)]):
+                Circle(1.25)
+            with Locations((0,0)):
+                Circle(2)
+            with Locations([(1.3-0.5, -5-0.5,9+1)]):
+                Rectangle(8.6,6.5)
+            with Locations([(-5-1.3+0.5,-3.7)]):
+                Rectangle(8.6,5.5)
+            with Locations((-5-1.3+1.25+2/2,-2)):
+                Rectangle(7.6+2.5+2,4)
+
+        with BuildSketch(Plane.XY.rotated((0,0,180))) as BottomKeyCutoutRot:
+            add(BottomKeyCutout.sketch)
+
+        sketches.bottomKeyCutout = BottomKeyCutout.sketch
+        sketches.bottomKeyCutoutRot = BottomKeyCutoutRot.sketch
+
+    return sketches
+
+## ------------------------------------------------------------------------------
+
+def build_bottom(params, sketches):
+    """ case rim below the plate, hiding PCB and hotswap sockets """
+    p = params
+    with BuildPart() as Bottom:
+        # the 3D shell needs the sharp inner corners, they are filleted afterwards
+        exact = p.fidelity == "production"
+        add(sketches.outline if exact else sketches.profile)
+        extrude(amount=p.heightBelowPlate)
+        with stage("shell", Bottom):
+            if exact:
+                # select faces that should not be offset = open faces
+                remFaces  = Bottom.faces().sort_by(Axis.Z)[0]
+                remFaces += Bottom.faces().sort_by(Axis.Z)[-1]
+                remFaces += Bottom.faces().sort_by(Axis.X)[:5].sort_by(Axis.Y)[-4:]
+                # create shell
+                offset(amount=-p.lWallWidth, openings=remFaces, kind=Kind.INTERSECTION)
+            else:
+                # same walls from a 2D offset, the whole seam is left open
+                add(sketches.shell)
+                extrude(amount=p.heightBelowPlate, mode=Mode.SUBTRACT)
+        if exact:
+            with stage("fillets", Bottom):
+                fillet(getInnerEdges(p, Bottom), p.outerRadSmall)
+    return Bottom.part
+
+
+def _plateCutouts(params):
+    """ clip pocket and switch hole tools of the plate band """
+    p = params
+    # work plane for further operations
+    wPlane = handPlane(p, p.heightBelowPlate)
+    # cutouts for switch clips
+    with BuildSketch(wPlane) as clips:
+        with Locations(getAllKeyPos(p)):
+            if p.holeFillet:
+                RectangleRounded(*p.clipCutout, p.holeFillet)
+            else:
+                Rectangle(*p.clipCutout)
+    # switch cutouts
+    with BuildSketch(wPlane) as holes:
+        with Locations(getAllKeyPos(p)):
+            if p.holeFillet:
+                RectangleRounded(p.holeSize, p.holeSize, p.holeFillet)
+            else:
+                Rectangle(p.holeSize, p.holeSize)
+    return [
+        extrude(clips.sketch, amount=p.plateHeight-p.plateClipHeight),
+        extrude(holes.sketch, amount=p.plateHeight),
+    ]
+
+
+def build_plate(params, sketches):
+    """ switch plate with clip pockets and switch holes """
+    p = params
+    with BuildPart(Plane(origin=(0,0,p.heightBelowPlate))) as Plate:
+        add(sketches.profile)
+        extrude(amount=p.plateHeight)
+
+    with stage("switch cutouts", Plate.part) as record:
+        part = cut_batched(Plate.part, _plateCutouts(p))
+        if record is not None:
+            record["result"] = part
+    return part
+
+
+def build_top(params, sketches):
+    """ case rim above the plate with keycap cutout and lowered middle """
+    p = params
+    z = p.heightBelowPlate+p.plateHeight
+    with BuildPart(Plane(origin=(0,0,z))) as Top:
+        add(sketches.profile)
+        extrude(amount=p.heightAbovePlate)
+        # add keycap cutout
+        with BuildSketch(handPlane(p, z)):
+            add(sketches.keyCutout)
+        extrude(amount=p.heightAbovePlate, mode=Mode.SUBTRACT)
+        # lower center cutout
+        extrude(Top.faces().filter_by(Axis.Z).group_by(Axis.Z)[-1].sort_by(Axis.X)[0],
+                amount=-p.centerInset, mode=Mode.SUBTRACT)
+    return Top.part
+
+
+def build_half_single(params, sketches, bottom=None):
+    """ right hand from a single extrusion of the outline
+
+    Used instead of build_bottom, build_plate, build_top and build_half if
+    ``singleExtrude`` is set: the filleted profile is extruded once to the
+    overall height, shell, switch cutouts and keycap cutout are cut to the
+    depth of their band. The shell is the same as the one of build_bottom: the
+    2D offset below production fidelity, at production the cavity the exact 3D
+    shell leaves in the band.
+
+    :param bottom: result of build_bottom, built here if needed and not given
+    """
+    p = params
+    z = p.heightBelowPlate+p.plateHeight
+    with BuildPart() as CaseHalf:
+        add(sketches.profile)
+        extrude(amount=p.overallHeight)
+        with stage("shell", CaseHalf):
+            if p.fidelity == "production":
+                with BuildPart() as band:
+                    add(sketches.profile)
+                    extrude(amount=p.heightBelowPlate)
+                if bottom is None:
+                    bottom = build_bottom(p, sketches)
+                add(band.part - bottom, mode=Mode.SUBTRACT)
+            else:
+                add(sketches.shell)
+                extrude(amount=p.heightBelowPlate, mode=Mode.SUBTRACT)
+        # add keycap cutout
+        with BuildSketch(handPlane(p, z)):
+            add(sketches.keyCutout)
+        extrude(amount=p.heightAbovePlate, mode=Mode.SUBTRACT)
+        # lower center cutout
+        extrude(CaseHalf.faces().filter_by(Axis.Z).group_by(Axis.Z)[-1].sort_by(Axis.X)[0],
+                amount=-p.centerInset, mode=Mode.SUBTRACT)
+    with stage("switch cutouts", CaseHalf.part) as record:
+        part = cut_batched(CaseHalf.part, _plateCutouts(p))
+        if record is not None:
+            record["result"] = part
+    return part
+
+
+def build_half(bottom, plate, top):
+    """ merges the three bands of the right hand """
+    with BuildPart() as CaseHalf:
+        add(bottom)
+        add(plate)
+        add(top)
+    return CaseHalf.part
+
+
+def build_full(params, sketches, half):
+    """ mirrors the right hand and adds seam fillets, groove, chamfers and USB cutout
+
+    :return FullCase
+    """
+    p = params
+    with BuildPart() as CaseFull:
+        with stage("mirror", CaseFull):
+            add(half)
+            mirror(half, about=Plane.YZ)
+
+        # add fillets on mirrored edges
+        if p.fillets:
+            with stage("fillets", CaseFull):
+                seam = _seamEdges(CaseFull.edges().filter_by(Axis.Z), p.seamSplitY, 0)
+                if seam:
+                    fillet(seam, p.seamFillet)
+                seam = _seamEdges(CaseFull.edges().filter_by(Axis.Z).group_by(Axis.Z)[-1], -25, p.seamSplitY)
+                if seam:
+                    fillet(seam, p.seamFillet)
+                seam = _seamEdges(CaseFull.edges().filter_by(Axis.Z).group_by(Axis.Z)[0], -25, p.seamSplitY)
+                if seam:
+                    fillet(seam, p.seamBottomFillet)
+
+        with stage("groove", CaseFull):
+            # add top groove
+            groove_wire = CaseFull.faces().filter_by(Axis.Z).group_by(Axis.Z)[-2][0].outer_wire()
+            groove_wire = groove_wire.rotate(Axis.Z, 180).translate((0,p.grooveOffset,p.centerInset))
+            extrude(Face(groove_wire), amount=-2, mode=Mode.SUBTRACT)
+
+            # fillet top groove edges
+            if p.grooveVertical:
+                groove_fil_edges = CaseFull.edges(Select.LAST).group_by(Axis.Y)[-1].filter_by(Axis.Z)
+            else:
+                groove_fil_edges = CaseFull.edges(Select.LAST).group_by(Axis.Y)[-1].sort_by(Axis.X)[1:-1]
+            if p.fillets:
+                fillet(groove_fil_edges, p.outerRadSmall)
+
+        with stage("chamfers", CaseFull):
+            # outline Chamfer
+            if p.topOuterChamfer and p.chamfers:
+                main_top_face = CaseFull.faces().filter_by(Axis.Z).group_by(Axis.Z)[-1].sort_by(Axis.X)[0]
+                chamfer(main_top_face.outer_wire().edges(), p.topOuterChamfer)
+            if p.topInnerChamfer and p.chamfers:
+                main_top_face = CaseFull.faces().filter_by(Axis.Z).group_by(Axis.Z)[-1].sort_by(Axis.X)[0]
+                chamfer(main_top_face.inner_wires().edges(), p.topInnerChamfer)
+
+            inset_face = CaseFull.faces().filter_by(Axis.Z).group_by(Axis.Z)[-2].sort_by(Axis.Y)[0]
+            if p.chamfers:
+                chamfer(inset_face.edges(), p.insetChamfer)
+
+            if p.bottomChamfer and p.chamfers:
+                bottom_face = CaseFull.faces().filter_by(Axis.Z).group_by(Axis.Z)[0][0]
+                chamfer(bottom_face.outer_wire().edges(), p.bottomChamfer)
+
+        if p.bottom_part_thickness:
+            with stage("bottom ridge", CaseFull):
+                # lower bottom ridge, added back with bottom part
+                extrude(CaseFull.faces().sort_by(Axis.Z)[0], amount=-p.bottom_part_thickness, mode=Mode.SUBTRACT)
+
+        bottomPlateWire = CaseFull.faces().sort_by(Axis.Z)[0].inner_wires()
+
+        with stage("usb cutout", CaseFull):
+            # usb cutout
+            usb_face = CaseFull.faces().filter_by(Axis.Y).group_by(Axis.Y)[-1].sort_by(SortBy.LENGTH)[-1]
+            usb_center = usb_face.center()
+            usb_plane = Plane(usb_face).shift_origin((usb_center.X,usb_center.Y,p.heightBelowPlate))
+            usb_z = p.heightBelowPlate + p.usbZOffset
+            with BuildSketch(usb_plane.shift_origin((usb_center.X,usb_center.Y,usb_z-p.usbStraightExtra/2))):
+                add(sketches.usbInner)
+            extrude(amount=-p.usbInnerDepth, mode=Mode.SUBTRACT)
+
+            with BuildSketch(usb_plane.shift_origin((usb_center.X,usb_center.Y,usb_z))):
+                add(sketches.usbOuter, rotation=180)
+            extrude(amount=-1, mode=Mode.SUBTRACT)
+
+            inner_usb_edges = CaseFull.faces(Select.LAST).filter_by(Axis.Y).sort_by(Axis.Y)[0].inner_wires().edges()
+            outer_usb_edges = CaseFull.edges(Select.LAST).group_by(Axis.Y)[-1].sort_by(Axis.X)[1:-1]
+
+            if p.usbInnerChamfer and p.chamfers:
+                chamfer(inner_usb_edges, p.usbInnerChamfer)
+            if p.usbOuterChamfer and p.chamfers:
+                chamfer(outer_usb_edges, p.usbOuterChamfer)
+
+    return FullCase(CaseFull.part, bottomPlateWire, inset_face)
+
+
+def build_bottom_plate(params, sketches, full):
+    """ bottom plate for the "inset" and "plate" bottom styles
+
+    :param full: FullCase the plate is fitted to
+    :return Part or None for open cases
+    """
+    p = params
+    if p.bottomStyle == "inset":
+        with BuildPart() as BottomPlate:
+            with BuildSketch():
+                with BuildLine():
+                    add(full.bottomWire)
+                make_face()
+                offset(amount=-p.bottomPlateInset)
+            extrude(amount=p.hsThickness)
+        return BottomPlate.part
+
+    if p.bottomStyle != "plate":
+        return None
+
+    cutDepth = max(p.bottom_part_thickness, p.hsThickness)
+    with BuildPart() as BottomPlate:
+        extrude(full.part.faces().sort_by(Axis.Z)[0], amount=p.bottom_part_thickness)
+        with BuildSketch():
+            make_face(full.bottomWire[0])
+        extrude(amount=p.bottom_part_thickness)
+        with BuildSketch():
+            make_face(full.bottomWire[0].offset_2d(-0.5))
+        extrude(amount=p.hsThickness)
+
+        middle_hole = full.insetFace.outer_wire().offset_2d(-1.5)
+        with BuildSketch():
+            make_face(middle_hole)
+        extrude(amount=5, mode=Mode.SUBTRACT)
+
+    mirPos = getAllKeyPosMir(p)
+    with BuildSketch(handPlane(p)) as alphas:
+        with Locations(getAlphaKeyPos(p)):
+            add(sketches.bottomKeyCutout)
+    with BuildSketch(handPlane(p)) as thumbs:
+        with Locations(getThumbKeyPos(p)):
+            add(sketches.bottomKeyCutoutRot)
+    with BuildSketch(handPlane(p, mirrored=True)) as alphasMir:
+        with Locations(mirPos[:-1]):
+            add(sketches.bottomKeyCutout)
+    with BuildSketch(handPlane(p, mirrored=True)) as thumbsMir:
+        with Locations(mirPos[-1]):
+            add(sketches.bottomKeyCutoutRot)
+
+    with stage("switch cutouts", BottomPlate.part) as record:
+        part = cut_batched(BottomPlate.part, [
+            extrude(sk.sketch, amount=cutDepth) for sk in (alphas, thumbs, alphasMir, thumbsMir)
+        ])
+        if record is not None:
+            record["result"] = part
+    return part
+
+## ------------------------------------------------------------------------------
+
+def _pack(name, value):
+    """ converts a stage result into named shapes for the cache """
+    if name == "CaseFull":
+        return {"part": value.part, "insetFace": value.insetFace,
+                "bottomWire": Compound(list(value.bottomWire))}
+    return {"part": value}
+
+
+def _unpack(name, shapes):
+    if name == "CaseFull":
+        return FullCase(shapes["part"], shapes["bottomWire"].wires(), shapes["insetFace"])
+    return shapes["part"]
+
+
+class StageRunner:
+    """ resolves stages on demand, looking them up in the cache first
+
+    A runner keeps its results, ``update`` switches it to new parameters and
+    only drops the stages that read a changed field::
+
+        runner = StageRunner(params)
+        runner.case()
+        runner.update(params.replace(usbStraightExtra=1))   # -> {"sketches", "CaseFull", "BottomPlate"}
+        runner.case()                                       # Bottom, Plate, Top and CaseHalf are reused
+
+    With ``parallel`` set, missing bands of the case half are built in worker
+    processes, see parallel.py.
+    """
+
+    def __init__(self, params, cache=None, parallel=False, sketches=None):
+        """
+        :param sketches: CaseSketches already built for these params
+        """
+        self.params = params
+        self.cache = cache
+        self.parallel = parallel
+        self.salt = kernel_version()
+        self.keys = stage_keys(params, self.salt)
+        self.results = {}
+        self.cleanups = {}        # stage name -> heal.CleanupReport
+        self._sketches = sketches
+
+    def update(self, params):
+        """ switches to new params, keeping all stages that are not affected
+
+        :return set of dirty stage names, see stages.dirty_stages
+        """
+        dirty = dirty_stages(self.params, params, self.salt)
+        for name in dirty:
+            self.results.pop(name, None)
+        if "sketches" in dirty:
+            self._sketches = None
+        self.params = params
+        self.keys = stage_keys(params, self.salt)
+        return dirty
+
+    @property
+    def sketches(self):
+        if self._sketches is None:
+            with stage("sketches"):
+                self._sketches = build_sketches(self.params)
+        return self._sketches
+
+    def _build(self, name, inputs):
+        p = self.params
+        if name == "Bottom":
+            return build_bottom(p, self.sketches)
+        if name == "Plate":
+            return build_plate(p, self.sketches)
+        if name == "Top":
+            return build_top(p, self.sketches)
+        if name == "CaseHalf":
+            if p.singleExtrude:
+                return build_half_single(p, self.sketches, *inputs)
+            return build_half(*inputs)
+        if name == "CaseFull":
+            return build_full(p, self.sketches, *inputs)
+        if name == "BottomPlate":
+            return build_bottom_plate(p, self.sketches, *inputs)
+        raise KeyError(name)
+
+    def _cleanup(self, name, value):
+        part = getattr(value, "part", value)
+        with stage("cleanup", part) as record:
+            part, report = unify(part)
+            if record is not None:
+                record["result"] = part
+        self.cleanups[name] = report
+        if isinstance(value, FullCase):
+            return dataclasses.replace(value, part=part)
+        return part
+
+    def _prefetch(self, names):
+        """ builds the missing stages of names concurrently """
+        missing = [n for n in names if self.peek(n) is None]
+        if len(missing) < 2:
+            return
+        from .parallel import build_bands
+        with stage("bands", workers=len(missing)):
+            shapes = build_bands(self.params, missing)
+        for n, shape in shapes.items():
+            self.results[n] = shape
+            if self.cache is not None:
+                self.cache.put(self.keys[n], _pack(n, shape))
+
+    def get(self, name):
+        if name in self.results:
+            return self.results[name]
+        value = None
+        if self.cache is not None:
+            with stage(name, cached=True) as record:
+                shapes = self.cache.get(self.keys[name])
+                if shapes is not None:
+                    value = _unpack(name, shapes)
+                if record is not None:
+                    record["hit"] = value is not None
+        if value is None:
+            # resolve upstream stages first, so their time is not counted here
+            upstream = stage_inputs(name, self.params)
+            if self.parallel and name == "CaseHalf":
+                self._prefetch(upstream)
+            inputs = [self.get(u) for u in upstream]
+            self.sketches
+            with stage(name) as record:
+                value = self._build(name, inputs)
+                if self.params.cleanup and value is not None:
+                    value = self._cleanup(name, value)
+                if record is not None:
+                    record["result"] = getattr(value, "part", value)
+            if self.cache is not None and value is not None:
+                self.cache.put(self.keys[name], _pack(name, value))
+        self.results[name] = value
+        return value
+
+    def peek(self, name):
+        """ returns a stage only if it is already resolved or cached """
+        if name not in self.results and self.cache is not None:
+            shapes = self.cache.get(self.keys[name])
+            if shapes is not None:
+                self.results[name] = _unpack(name, shapes)
+        return self.results.get(name)
+
+    def case(self):
+        """ resolves the full case (and bottom plate)
+
+        :return CaseBuild
+        :raises InfeasibleParams: before any stage is built, see validate.check
+        """
+        validate(self.params)
+        full = self.get("CaseFull")
+        bottomPlate = self.get("BottomPlate") if self.params.bottomStyle != "open" else None
+        return CaseBuild(self.params,
+                         self.peek("Bottom"), self.peek("Plate"), self.peek("Top"),
+                         self.peek("CaseHalf"), full.part, bottomPlate)
+
+
+def build_case(params, cache=None, parallel=False):
+    """ builds all parts of a case variant
+
+    :param params: CaseParams
+    :param cache: optional BuildCache, stages with an unchanged key are loaded
+        instead of rebuilt and upstream stages are only built if needed
+    :param parallel: build Bottom, Plate and Top in three worker processes
+    :return CaseBuild
+    """
+    return StageRunner(params, cache, parallel).case()
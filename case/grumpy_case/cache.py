@@ -0,0 +1,98 @@
+""" persistent cache of built stages
+
+Every entry is a directory named after the stage key (see ``stages.stage_keys``)
+holding one binary BREP file per stored shape. Entries are evicted least
+recently used first once the cache grows above ``maxSize`` bytes.
+"""
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from .brep import read_brep, write_brep
+
+DEFAULT_PATH = Path(os.environ.get("GRUMPY_CACHE", Path.home() / ".cache" / "grumpy_case"))
+DEFAULT_SIZE = 2 * 1024**3
+
+
+class BuildCache:
+    def __init__(self, path=DEFAULT_PATH, maxSize=DEFAULT_SIZE):
+        """
+        :param path: cache directory, created if missing
+        :param maxSize: size limit in bytes
+        """
+        self.path = Path(path)
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key):
+        return self.path / key[:2] / key
+
+    def get(self, key):
+        """ loads a cached entry
+
+        :return dict name -> shape, or None if the key is not cached
+        """
+        entry = self._entry(key)
+        try:
+            files = sorted(entry.glob("*.brep"))
+            shapes = {f.stem: read_brep(f) for f in files}
+        except OSError:
+            shapes = None
+        if not shapes:
+            self.misses += 1
+            return None
+        # mark as recently used
+        os.utime(entry)
+        self.hits += 1
+        return shapes
+
+    def put(self, key, shapes):
+        """ stores the shapes of a stage and evicts old entries if needed
+
+        :param shapes: dict name -> shape
+        """
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=entry.parent, prefix=".tmp-"))
+        try:
+            for name, shape in shapes.items():
+                write_brep(shape, tmp / f"{name}.brep")
+            # rename is atomic, a concurrent writer of the same key wins
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def entries(self):
+        """ returns (last use, size, path) of all entries, oldest first """
+        result = []
+        for entry in self.path.glob("??/*"):
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                result.append((entry.stat().st_mtime, size, entry))
+            except OSError:
+                continue
+        return sorted(result)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, maxSize=None):
+        """ removes least recently used entries until the cache fits maxSize """
+        maxSize = self.maxSize if maxSize is None else maxSize
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= maxSize:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        self.evict(0)
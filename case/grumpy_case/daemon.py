@@ -0,0 +1,278 @@
+""" warm build daemon with a local socket API
+
+Starting Python, importing build123d and initialising OCC costs more than
+many small builds. The daemon keeps a bounded pool of worker processes with
+the kernel loaded and the sketches of recent parameter sets in memory. Jobs
+are sent to a Unix socket as one json line, the daemon answers with json
+event lines until the job is finished::
+
+    -> {"base": "choc", "params": {"handAngle": 15}, "out": "/tmp/job", "formats": ["stl:draft"]}
+    <- {"event": "queued", "job": 1}
+    <- {"event": "stage", "job": 1, "name": "Bottom", "seconds": 1.52}
+    <- {"event": "output", "job": 1, "path": "/tmp/job/case.stl", ...}
+    <- {"event": "done", "job": 1, "status": "ok", "seconds": 9.81}
+
+A job that cannot be accepted, fails or runs past the timeout of the daemon
+ends with ``{"event": "error"}``, the worker of a job that timed out is
+replaced.
+
+Usage::
+
+    python -m grumpy_case.daemon serve -j 4 --timeout 300
+    python -m grumpy_case.daemon submit params.json -o out/ --format stl:draft
+"""
+
+import argparse
+import errno
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from .export import parse_output
+from .params import CaseParams
+from .stages import SKETCHES
+from .validate import validate
+from .workers import JobTimeout, WorkerPool
+
+DEFAULT_SOCKET = Path(os.environ.get(
+    "GRUMPY_SOCKET", Path(tempfile.gettempdir()) / f"grumpy_case-{os.getuid()}.sock"))
+
+# sketches kept per worker
+SKETCH_CACHE_SIZE = 16
+
+_cache = None
+_sketches = OrderedDict()
+
+## ------------------------------------------------------------------------------
+# worker side
+
+def _init_worker(cachePath):
+    global _cache
+    os.environ["GRUMPY_HEADLESS"] = "1"
+    # load the kernel when the worker starts, not with the first job
+    from . import build  # noqa: F401
+
+    if cachePath:
+        from .cache import BuildCache
+        _cache = BuildCache(cachePath)
+
+
+def _run(job, params, outDir, formats, events):
+    """ builds one job in a worker, progress is put into the events queue """
+    from .batch import export_parts
+    from .build import StageRunner
+    from .profiling import Profiler
+
+    def progress(record):
+        if record["depth"] == 0:
+            events.put({"event": "stage", "job": job, "name": record["name"],
+                        "seconds": round(record["seconds"], 3)})
+
+    key = tuple(getattr(params, f) for f in SKETCHES)
+    runner = StageRunner(params, _cache, sketches=_sketches.get(key))
+    with Profiler(topology=False, listener=progress):
+        case = runner.case()
+        if outDir:
+            for report in export_parts(case, outDir, formats):
+                events.put({"event": "output", "job": job, **report})
+
+    _sketches[key] = runner.sketches
+    _sketches.move_to_end(key)
+    while len(_sketches) > SKETCH_CACHE_SIZE:
+        _sketches.popitem(last=False)
+
+## ------------------------------------------------------------------------------
+# server side
+
+def _listening(path):
+    """ whether something accepts connections on a Unix socket path """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+    return True
+
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path=DEFAULT_SOCKET, workers=None, maxPending=16, cachePath=None, timeout=None):
+        """
+        :param path: Unix socket path, a stale socket left by a crashed daemon
+            is replaced, OSError if another daemon answers on it
+        :param workers: worker processes, default number of cores
+        :param maxPending: jobs waiting for a worker before new ones are rejected
+        :param cachePath: BuildCache directory shared by the workers
+        :param timeout: seconds a job may run, its worker is killed and
+            replaced after that, None for no limit
+        """
+        path = Path(path)
+        if path.exists() or path.is_symlink():
+            if not stat.S_ISSOCK(path.lstat().st_mode):
+                raise OSError(errno.EEXIST, "not a socket", str(path))
+            if _listening(path):
+                raise OSError(errno.EADDRINUSE, "a daemon is already listening", str(path))
+            path.unlink()
+
+        self.workers = workers or os.cpu_count()
+        self.cachePath = cachePath
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(self.workers + maxPending)
+        self.jobIds = itertools.count(1)
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._pool = WorkerPool(self.workers, _init_worker, (self.cachePath,), mp_context=ctx)
+        super().__init__(str(path), _Handler)
+
+    def submit(self, *args):
+        """ queues a job, see _run
+
+        :return Future, failing with workers.JobTimeout or workers.WorkerDied
+        """
+        return self._pool.submit(_run, *args, timeout=self.timeout)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown()
+        self._manager.shutdown()
+        Path(self.server_address).unlink(missing_ok=True)
+
+
+def _parseRequest(request):
+    """ validates a request in the daemon process, before a worker is used
+
+    :return (params, outDir, formats)
+    """
+    params = validate(CaseParams.from_dict(request.get("params", {}), request.get("base", "mx")))
+    formats = request.get("formats", ["step"])
+    for spec in formats:
+        parse_output(spec)
+    return params, request.get("out"), formats
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def send(self, event):
+        try:
+            self.wfile.write(json.dumps(event, default=list).encode() + b"\n")
+            self.wfile.flush()
+        except OSError:
+            # client went away, the job still finishes
+            pass
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            params, outDir, formats = _parseRequest(json.loads(line))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.send({"event": "error", "message": f"invalid request: {e}"})
+            return
+
+        server = self.server
+        if not server.slots.acquire(blocking=False):
+            self.send({"event": "error", "message": "busy, too many pending jobs"})
+            return
+        last = {"event": "error", "message": "internal error"}
+        try:
+            job = next(server.jobIds)
+            start = time.perf_counter()
+            events = server._manager.Queue()
+            self.send({"event": "queued", "job": job})
+            future = server.submit(job, params, outDir, formats, events)
+            while not future.done():
+                try:
+                    self.send(events.get(timeout=0.2))
+                except queue.Empty:
+                    pass
+            # events put after the last get, before the job finished
+            while True:
+                try:
+                    self.send(events.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                future.result()
+                last = {"event": "done", "job": job, "status": "ok",
+                        "seconds": round(time.perf_counter() - start, 3)}
+            except JobTimeout:
+                last = {"event": "error", "job": job, "message": f"timeout after {server.timeout}s"}
+            except Exception as e:
+                last = {"event": "error", "job": job, "message": f"{type(e).__name__}: {e}"}
+        finally:
+            # free the slot before the client sees the end of the job
+            server.slots.release()
+        self.send(last)
+
+
+def submit(request, path=DEFAULT_SOCKET):
+    """ sends a job to a running daemon
+
+    :param request: dict with "base", "params", "out" and "formats"
+    :return iterator of event dicts, ends with a "done" or "error" event
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(path))
+        sock.sendall(json.dumps(request, default=list).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            for line in f:
+                event = json.loads(line)
+                yield event
+                if event["event"] in ("done", "error"):
+                    return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="warm grumpy case build daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the daemon")
+    serve.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    serve.add_argument("--pending", type=int, default=16, help="max. jobs waiting for a worker")
+    serve.add_argument("--cache", default=None, help="BuildCache directory shared by the workers")
+    serve.add_argument("--timeout", type=float, default=600,
+                       help="seconds per job, its worker is killed and replaced after that, 0 disables")
+
+    job = sub.add_parser("submit", help="send a job and print its events")
+    job.add_argument("params", help="json file with parameter changes, \"base\" selects the preset")
+    job.add_argument("-o", "--out", default=None, help="output directory")
+    job.add_argument("--format", action="append", help="output spec, e.g. step or stl:draft (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            daemon = Daemon(args.socket, args.jobs, args.pending, args.cache, args.timeout or None)
+        except OSError as e:
+            raise SystemExit(f"cannot listen on {args.socket}: {e.strerror}")
+        with daemon:
+            print(f"listening on {args.socket} with {daemon.workers} workers")
+            try:
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                pass
+        return
+
+    data = json.loads(Path(args.params).read_text())
+    request = {"base": data.pop("base", "mx"), "params": data,
+               "out": str(Path(args.out).resolve()) if args.out else None,
+               "formats": args.format or ["step"]}
+    for event in submit(request, args.socket):
+        print(json.dumps(event))
+        if event["event"] == "error":
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+""" STL/STEP export with tessellation profiles
+
+The shape is meshed by OCC with parallel face meshing enabled, then the
+triangles are streamed face by face into a binary STL file, so the mesh is
+never collected in Python memory.
+"""
+
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from .profiling import stage
+
+# name -> (linear deflection in mm, angular deflection in radians)
+PROFILES = {
+    "draft": (0.1, 0.5),
+    "print": (0.01, 0.2),
+    "cnc": (0.002, 0.1),
+}
+DEFAULT_PROFILE = "print"
+
+_RECORD = struct.Struct("<12fH")
+
+
+@dataclass
+class ExportReport:
+    path: str
+    format: str
+    profile: str = None
+    triangles: int = 0
+    seconds: float = 0
+    bytes: int = 0
+
+
+def deflection(profile):
+    """ resolves a profile name or a (linear, angular) tuple """
+    if isinstance(profile, str):
+        try:
+            return PROFILES[profile]
+        except KeyError:
+            raise ValueError(f"unknown tessellation profile {profile}") from None
+    return tuple(profile)
+
+
+def iter_triangles(shape, tolerance, angularTolerance, parallel=True):
+    """ meshes a shape and yields its triangles face by face
+
+    :param shape: build123d shape
+    :param parallel: mesh the faces in parallel threads inside OCC
+    :return iterator of ((x, y, z), (x, y, z), (x, y, z)), counter clockwise
+        seen from outside
+    """
+    from OCP.BRep import BRep_Tool
+    from OCP.BRepMesh import BRepMesh_IncrementalMesh
+    from OCP.BRepTools import BRepTools
+    from OCP.TopAbs import TopAbs_FACE, TopAbs_REVERSED
+    from OCP.TopExp import TopExp_Explorer
+    from OCP.TopLoc import TopLoc_Location
+    from OCP.TopoDS import TopoDS
+
+    # drop an existing (possibly finer) triangulation, OCC would keep it otherwise
+    BRepTools.Clean_s(shape.wrapped)
+    BRepMesh_IncrementalMesh(shape.wrapped, tolerance, False, angularTolerance, parallel)
+
+    explorer = TopExp_Explorer(shape.wrapped, TopAbs_FACE)
+    while explorer.More():
+        face = TopoDS.Face_s(explorer.Current())
+        explorer.Next()
+        loc = TopLoc_Location()
+        poly = BRep_Tool.Triangulation_s(face, loc)
+        if poly is None:
+            continue
+        trsf = loc.Transformation()
+        nodes = [None]
+        for i in range(1, poly.NbNodes() + 1):
+            p = poly.Node(i).Transformed(trsf)
+            nodes.append((p.X(), p.Y(), p.Z()))
+        order = (1, 3, 2) if face.Orientation() == TopAbs_REVERSED else (1, 2, 3)
+        for i in range(1, poly.NbTriangles() + 1):
+            t = poly.Triangle(i)
+            yield tuple(nodes[t.Value(k)] for k in order)
+
+
+def _normal(a, b, c):
+    ux, uy, uz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    vx, vy, vz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    n = (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+    length = (n[0] ** 2 + n[1] ** 2 + n[2] ** 2) ** 0.5 or 1.0
+    return (n[0] / length, n[1] / length, n[2] / length)
+
+
+def write_stl_stream(path, triangles, header=b"grumpy_case"):
+    """ writes triangles to a binary STL file as they come in
+
+    The triangle count in the header is patched once the iterator is exhausted.
+
+    :param triangles: iterable of (a, b, c) vertex tuples
+    :return number of triangles written
+    """
+    count = 0
+    with open(path, "wb") as f:
+        f.write(header[:80].ljust(80, b"\0"))
+        f.write(struct.pack("<I", 0))
+        for a, b, c in triangles:
+            f.write(_RECORD.pack(*_normal(a, b, c), *a, *b, *c, 0))
+            count += 1
+        f.seek(80)
+        f.write(struct.pack("<I", count))
+    return count
+
+
+def export_stl(shape, path, profile=DEFAULT_PROFILE, parallel=True):
+    """ meshes shape with the given profile and streams it to a binary STL
+
+    :param profile: name in PROFILES or (linear, angular) deflection tuple
+    :return ExportReport
+    """
+    start = time.perf_counter()
+    tolerance, angular = deflection(profile)
+    with stage("export", shape, file=Path(path).name):
+        count = write_stl_stream(path, iter_triangles(shape, tolerance, angular, parallel))
+    return ExportReport(str(path), "stl", profile if isinstance(profile, str) else str(profile),
+                        count, time.perf_counter() - start, Path(path).stat().st_size)
+
+
+def export_step(shape, path):
+    """ writes a STEP file
+
+    :return ExportReport
+    """
+    from build123d import export_step as _export_step
+
+    start = time.perf_counter()
+    with stage("export", shape, file=Path(path).name):
+        _export_step(shape, str(path))
+    return ExportReport(str(path), "step", seconds=time.perf_counter() - start,
+                        bytes=Path(path).stat().st_size)
+
+
+def parse_output(spec):
+    """ splits an output spec like "stl:draft" or "png:top" into (format, profile)
+
+    The profile of a PNG thumbnail is its view, see render.VIEWS.
+    """
+    fmt, _, profile = spec.partition(":")
+    if fmt not in ("step", "stl", "png"):
+        raise ValueError(f"unknown export format {fmt}")
+    if fmt == "stl":
+        profile = profile or DEFAULT_PROFILE
+        deflection(profile)
+    elif fmt == "png":
+        from .render import DEFAULT_VIEW, VIEWS
+
+        profile = profile or DEFAULT_VIEW
+        if profile not in VIEWS:
+            raise ValueError(f"unknown view {profile}")
+    elif profile:
+        raise ValueError("STEP output has no tessellation profile")
+    return fmt, profile or None
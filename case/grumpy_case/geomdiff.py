@@ -0,0 +1,354 @@
+""" geometric regression diff of fresh builds against the files in prod/
+
+Every reference is compared in two steps:
+
+* fingerprints (volume, area, bounding box, face count and the principal
+  moments of inertia), which take milliseconds and catch almost every change,
+* only if a fingerprint differs, a sampled two sided Hausdorff distance.
+  Points are sampled area weighted on both meshes, their nearest triangles
+  on the other mesh are found with KD-trees (scipy) over its triangle
+  centroids and measured exactly.
+  Points further away than the tolerance are merged into regions.
+
+STEP references are fingerprinted by the kernel, STL references from the
+triangles, the build is then tessellated as well. All references are in the
+assembly position of the case.
+
+Usage: ``python -m grumpy_case.geomdiff [lp choc mx] --tolerance 0.05``
+"""
+
+import argparse
+import json
+import math
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .brep import load_step
+from .export import deflection, iter_triangles
+from .geometry import dot, point_triangle
+from .interference import load_stl
+from .params import CHOC, LP, MX
+
+PROD_DIR = Path(__file__).resolve().parent.parent.parent / "prod"
+
+# name -> (params, part of CaseBuild, reference file, tolerance in mm)
+REFERENCES = {
+    "lp": (LP, "full", PROD_DIR / "MX ChocV2 low profile" / "case_chocV2" / "grumpy_lp.step", 0.05),
+    "choc": (CHOC, "full", PROD_DIR / "ChocV1 low profile" / "case_choc" / "grumpy_lp_choc_top.step", 0.05),
+    # has to cover the chord error of the exported mesh
+    "mx": (MX, "full", PROD_DIR / "MX Xiao" / "case_mx" / "grumpy.stl", 0.1),
+}
+# relative difference of volume, area and inertia counted as a change
+RTOL = 1e-4
+# distances below this are not reported (mm)
+TOLERANCE = 0.05
+# random points per surface, all vertices are measured as well
+SAMPLES = 20000
+# longer triangle edges are split for SurfaceIndex (mm)
+INDEX_EDGE = 2.0
+# edge length of the cells points are grouped into regions with (mm)
+REGION_CELL = 2.0
+
+
+class Fingerprint(NamedTuple):
+    volume: float
+    area: float
+    bbox: tuple          # (xmin, ymin, zmin, xmax, ymax, zmax)
+    faces: int           # BREP faces, triangles for meshes
+    inertia: tuple       # principal moments about the center of mass, ascending
+
+
+class Region(NamedTuple):
+    side: str            # "build" for material only in the build, "reference" otherwise
+    bbox: tuple
+    distance: float      # largest distance in the region
+    points: int
+
+
+class DiffReport(NamedTuple):
+    name: str
+    reference: str
+    changed: list        # names of the differing fingerprint fields
+    hausdorff: float     # None if the fingerprints match
+    regions: list
+    seconds: float
+
+    @property
+    def ok(self):
+        return not self.regions
+
+## ------------------------------------------------------------------------------
+# fingerprints
+
+def shape_fingerprint(shape):
+    """ exact fingerprint of a build123d shape """
+    from OCP.BRepGProp import BRepGProp
+    from OCP.GProp import GProp_GProps
+
+    props = GProp_GProps()
+    BRepGProp.VolumeProperties_s(shape.wrapped, props)
+    moments = props.PrincipalProperties().Moments()
+    bb = shape.bounding_box()
+    return Fingerprint(props.Mass(), shape.area,
+                       (bb.min.X, bb.min.Y, bb.min.Z, bb.max.X, bb.max.Y, bb.max.Z),
+                       len(shape.faces()), tuple(sorted(moments)))
+
+
+def mesh_fingerprint(tris):
+    """ fingerprint of a closed triangle mesh (N, 3, 3)
+
+    Volume and second moments are summed over the tetrahedra spanned by the
+    origin and every triangle.
+    """
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    det = np.einsum("ij,ij->i", a, np.cross(b, c))
+    volume = det.sum() / 6
+    center = (det[:, None] * (a + b + c)).sum(0) / 24 / volume
+    s = a + b + c
+    cov = (np.einsum("n,nij->ij", det, np.einsum("ni,nj->nij", a, a) + np.einsum("ni,nj->nij", b, b)
+                     + np.einsum("ni,nj->nij", c, c) + np.einsum("ni,nj->nij", s, s)) / 120
+           - volume * np.outer(center, center))
+    inertia = np.trace(cov) * np.eye(3) - cov
+    area = np.linalg.norm(np.cross(b - a, c - a), axis=1).sum() / 2
+    lo, hi = tris.reshape(-1, 3).min(0), tris.reshape(-1, 3).max(0)
+    return Fingerprint(float(volume), float(area), (*map(float, lo), *map(float, hi)),
+                       len(tris), tuple(sorted(map(float, np.linalg.eigvalsh(inertia)))))
+
+
+def compare_fingerprints(a, b, rtol=RTOL, atol=TOLERANCE):
+    """ :return names of the fields that differ """
+    changed = []
+    if not math.isclose(a.volume, b.volume, rel_tol=rtol):
+        changed.append("volume")
+    if not math.isclose(a.area, b.area, rel_tol=rtol):
+        changed.append("area")
+    if any(abs(x - y) > atol for x, y in zip(a.bbox, b.bbox)):
+        changed.append("bbox")
+    if a.faces != b.faces:
+        changed.append("faces")
+    if any(not math.isclose(x, y, rel_tol=rtol) for x, y in zip(a.inertia, b.inertia)):
+        changed.append("inertia")
+    return changed
+
+## ------------------------------------------------------------------------------
+# sampled Hausdorff distance
+
+def shape_triangles(shape, profile="print"):
+    """ :return float array (N, 3, 3) of the triangles of a build123d shape """
+    tolerance, angular = deflection(profile)
+    return np.array(list(iter_triangles(shape, tolerance, angular)), dtype=np.float64).reshape(-1, 3, 3)
+
+
+def sample_surface(tris, count, rng):
+    """ area weighted random points on a mesh plus all of its vertices
+
+    :return (M, 3) array
+    """
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    area = np.linalg.norm(np.cross(b - a, c - a), axis=1)
+    owner = rng.choice(len(tris), size=count, p=area / area.sum())
+    r1, r2 = np.sqrt(rng.random(count))[:, None], rng.random(count)[:, None]
+    pnts = (1 - r1) * a[owner] + r1 * (1 - r2) * b[owner] + r1 * r2 * c[owner]
+    return np.concatenate([pnts, np.unique(tris.reshape(-1, 3), axis=0)])
+
+
+def subdivide(tris, length):
+    """ bisects the longest edge of every triangle until no edge is longer than length """
+    done = []
+    while len(tris):
+        edges = np.linalg.norm(np.roll(tris, -1, axis=1) - tris, axis=2)
+        longest = edges.argmax(1)
+        split = edges[np.arange(len(tris)), longest] > length
+        done.append(tris[~split])
+        tris, longest = tris[split], longest[split]
+        # rotate the vertices, so the longest edge runs from vertex 0 to 1
+        order = (longest[:, None] + np.arange(3)) % 3
+        tris = np.take_along_axis(tris, order[:, :, None], axis=1)
+        mid = (tris[:, 0] + tris[:, 1]) / 2
+        tris = np.concatenate([np.stack([tris[:, 0], mid, tris[:, 2]], axis=1),
+                               np.stack([mid, tris[:, 1], tris[:, 2]], axis=1)])
+    return np.concatenate(done)
+
+
+class SurfaceIndex:
+    def __init__(self, tris):
+        """ KD-tree over the triangle centroids of a mesh
+
+        Long triangles are split first, so no point of a triangle is further
+        than radius from its centroid. The nearest triangle of a point is
+        then among the centroids closer than any upper bound plus radius.
+        """
+        from scipy.spatial import cKDTree
+
+        self.triangles = tris = subdivide(tris, INDEX_EDGE)
+        self.lo, self.hi = tris.min(1), tris.max(1)
+        centroids = tris.mean(1)
+        self.radius = np.linalg.norm(tris - centroids[:, None], axis=2).max()
+        self.tree = cKDTree(centroids)
+
+    def _exact(self, points, owner, tris):
+        tris = self.triangles[tris]
+        return point_triangle(points[owner], tris[:, 0], tris[:, 1], tris[:, 2])
+
+    def distance(self, points, chunk=20000):
+        """ exact distance of points to the mesh """
+        result = np.empty(len(points))
+        for i in range(0, len(points), chunk):
+            pnts = points[i:i + chunk]
+            every = np.arange(len(pnts))
+            # upper bound from the triangle with the nearest centroid
+            _, nearest = self.tree.query(pnts)
+            bound = self._exact(pnts, every, nearest)
+            found = self.tree.query_ball_point(pnts, bound + self.radius)
+            counts = np.fromiter(map(len, found), int, len(found))
+            owner = np.repeat(every, counts)
+            tris = np.concatenate(found).astype(int)
+            # distance to the bounding box of the triangle is a cheap lower bound
+            p = pnts[owner]
+            gap = np.maximum(np.maximum(self.lo[tris] - p, p - self.hi[tris]), 0)
+            near = dot(gap, gap) < bound[owner] ** 2
+            owner, tris = owner[near], tris[near]
+            np.minimum.at(bound, owner, self._exact(pnts, owner, tris))
+            result[i:i + chunk] = bound
+        return result
+
+
+def _regions(points, dist, side, tolerance, cell=REGION_CELL):
+    """ merges points further away than tolerance into regions of touching cells """
+    far = dist > tolerance
+    points, dist = points[far], dist[far]
+    if not len(points):
+        return []
+    cells = {}
+    for key, i in zip(map(tuple, np.floor(points / cell).astype(int)), range(len(points))):
+        cells.setdefault(key, []).append(i)
+
+    # union find over the 26 neighbourhood of the cells
+    parent = {key: key for key in cells}
+
+    def find(key):
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    offsets = [(i, j, k) for i in (-1, 0, 1) for j in (-1, 0, 1) for k in (-1, 0, 1)]
+    for x, y, z in cells:
+        for i, j, k in offsets:
+            other = (x + i, y + j, z + k)
+            if other in cells:
+                parent[find(other)] = find((x, y, z))
+
+    groups = {}
+    for key, members in cells.items():
+        groups.setdefault(find(key), []).extend(members)
+    regions = []
+    for members in groups.values():
+        pnts = points[members]
+        lo, hi = pnts.min(0), pnts.max(0)
+        regions.append(Region(side, (*map(float, lo), *map(float, hi)), float(dist[members].max()),
+                              len(members)))
+    return sorted(regions, key=lambda r: -r.distance)
+
+
+def hausdorff(build, reference, samples=SAMPLES, tolerance=TOLERANCE, seed=0):
+    """ sampled two sided Hausdorff distance of two meshes
+
+    :param build: (N, 3, 3) triangles
+    :param reference: (M, 3, 3) triangles
+    :param samples: random points per surface, the vertices are always measured
+    :return (distance, list of Region beyond tolerance)
+    """
+    rng = np.random.default_rng(seed)
+    regions, distance = [], 0.0
+    for side, tris, other in (("build", build, reference), ("reference", reference, build)):
+        points = sample_surface(tris, samples, rng)
+        dist = SurfaceIndex(other).distance(points)
+        distance = max(distance, float(dist.max()))
+        regions += _regions(points, dist, side, tolerance)
+    return distance, sorted(regions, key=lambda r: -r.distance)
+
+
+## ------------------------------------------------------------------------------
+
+def load_reference(path):
+    """ :return build123d shape of a STEP file or triangles of a STL file """
+    path = Path(path)
+    if path.suffix.lower() == ".stl":
+        return load_stl(path)
+    return load_step(path)
+
+
+def diff(name, part, reference, samples=SAMPLES, tolerance=TOLERANCE, profile="print"):
+    """ compares a built part with a reference
+
+    :param part: build123d shape
+    :param reference: path of a STEP or STL file
+    :return DiffReport
+    """
+    start = time.perf_counter()
+    ref = load_reference(reference)
+    buildTris = refTris = None
+    if isinstance(ref, np.ndarray):
+        refTris = ref
+        buildTris = shape_triangles(part, profile)
+        # two tessellations never agree exactly, compare with the chord tolerance
+        changed = compare_fingerprints(mesh_fingerprint(buildTris), mesh_fingerprint(refTris),
+                                       rtol=1e-2, atol=tolerance)
+        changed = [field for field in changed if field != "faces"]
+    else:
+        changed = compare_fingerprints(shape_fingerprint(part), shape_fingerprint(ref), atol=tolerance)
+
+    distance, regions = None, []
+    if changed:
+        if refTris is None:
+            refTris = shape_triangles(ref, profile)
+            buildTris = shape_triangles(part, profile)
+        distance, regions = hausdorff(buildTris, refTris, samples, tolerance)
+    return DiffReport(name, str(reference), changed, distance, regions, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="compare fresh case builds with the files in prod/")
+    parser.add_argument("names", nargs="*", help=f"references to check ({', '.join(sorted(REFERENCES))}), "
+                                                 f"default all")
+    parser.add_argument("--tolerance", type=float, help="mm, overrides the tolerance of the references")
+    parser.add_argument("--samples", type=int, default=SAMPLES, help="points per surface")
+    parser.add_argument("--json", help="write the reports to this file")
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in REFERENCES:
+            parser.error(f"unknown reference {name}")
+
+    from .build import build_case
+
+    reports = []
+    for name in args.names or sorted(REFERENCES):
+        params, part, path, tolerance = REFERENCES[name]
+        if args.tolerance is not None:
+            tolerance = args.tolerance
+        report = diff(name, getattr(build_case(params), part), path, args.samples, tolerance)
+        reports.append(report)
+        if not report.changed:
+            print(f"{name}: identical fingerprint ({report.seconds:.2f}s)")
+            continue
+        print(f"{name}: {', '.join(report.changed)} changed, Hausdorff {report.hausdorff:.3f}mm "
+              f"({report.seconds:.2f}s)")
+        for r in report.regions:
+            lo, hi = r.bbox[:3], r.bbox[3:]
+            print(f"  {r.side:9} {r.distance:6.3f}mm  "
+                  f"({lo[0]:.1f}, {lo[1]:.1f}, {lo[2]:.1f}) - ({hi[0]:.1f}, {hi[1]:.1f}, {hi[2]:.1f})"
+                  f"  {r.points} points")
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            [{**r._asdict(), "regions": [g._asdict() for g in r.regions], "ok": r.ok} for r in reports],
+            indent=2))
+    if not all(r.ok for r in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
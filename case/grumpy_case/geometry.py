@@ -0,0 +1,46 @@
+""" distance kernels shared by the clearance check and the geometric diff
+
+All functions take NumPy arrays of points, vectorized over the leading axes.
+"""
+
+import numpy as np
+
+
+def dot(a, b):
+    """ dot product over the last axis """
+    return np.einsum("...i,...i->...", a, b)
+
+
+def point_segment(p, a, b):
+    """ distance of points to segments """
+    ab = b - a
+    t = np.clip(dot(p - a, ab) / np.maximum(dot(ab, ab), 1e-300), 0, 1)
+    return np.linalg.norm(p - (a + ab * t[..., None]), axis=-1)
+
+
+def point_triangle(p, a, b, c):
+    """ distance of points to triangles, interior projection or nearest edge """
+    ab, ac, ap = b - a, c - a, p - a
+    n = np.cross(ab, ac)
+    nn = np.maximum(dot(n, n), 1e-300)
+    # barycentric coordinates of the projection
+    v = dot(np.cross(ap, ac), n) / nn
+    w = dot(np.cross(ab, ap), n) / nn
+    inside = (v >= 0) & (w >= 0) & (v + w <= 1)
+    plane = np.abs(dot(ap, n)) / np.sqrt(nn)
+    edges = np.minimum(np.minimum(point_segment(p, a, b), point_segment(p, b, c)), point_segment(p, c, a))
+    return np.where(inside, plane, edges)
+
+
+def segment_segment(p1, q1, p2, q2):
+    """ distance of segment pairs (Ericson, Real-Time Collision Detection 5.1.9) """
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a = np.maximum(dot(d1, d1), 1e-300)
+    e = np.maximum(dot(d2, d2), 1e-300)
+    b, c, f = dot(d1, d2), dot(d1, r), dot(d2, r)
+    denom = a * e - b * b
+    s = np.where(denom > 1e-12, np.clip((b * f - c * e) / np.where(denom > 1e-12, denom, 1), 0, 1), 0)
+    t = (b * s + f) / e
+    s = np.where(t < 0, np.clip(-c / a, 0, 1), np.where(t > 1, np.clip((b - c) / a, 0, 1), s))
+    t = np.clip(t, 0, 1)
+    return np.linalg.norm(p1 + d1 * s[..., None] - p2 - d2 * t[..., None], axis=-1)
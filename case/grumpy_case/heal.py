@@ -0,0 +1,61 @@
+""" face merging and shape healing between build stages
+
+Every subtract extrude leaves coplanar faces split along the tool outline and
+seam edges in between. ``unify`` merges faces and edges lying on the same
+surface or curve, then runs the OCC shape fixer. Later selections, fillets and
+the tessellation work on less topology and exported files get smaller.
+
+Enabled by ``CaseParams.cleanup``, the stage runner then unifies every stage
+result before it is cached or passed on.
+"""
+
+from dataclasses import dataclass
+
+# relative volume change above which a unified shape is rejected
+VOLUME_TOLERANCE = 1e-6
+
+
+@dataclass
+class CleanupReport:
+    facesBefore: int
+    facesAfter: int
+    edgesBefore: int
+    edgesAfter: int
+    applied: bool = True      # False if the result was rejected and the input kept
+
+    def __str__(self):
+        state = "" if self.applied else " (rejected)"
+        return (f"faces {self.facesBefore}->{self.facesAfter}  "
+                f"edges {self.edgesBefore}->{self.edgesAfter}{state}")
+
+
+def unify(shape, heal=True):
+    """ merges same domain faces and edges of a shape
+
+    The result is only used if it is valid and has the volume of the input
+    (within VOLUME_TOLERANCE), otherwise the input is returned unchanged.
+
+    :param shape: build123d shape
+    :param heal: run ShapeFix_Shape on the unified shape
+    :return (shape, CleanupReport)
+    """
+    from OCP.ShapeFix import ShapeFix_Shape
+    from OCP.ShapeUpgrade import ShapeUpgrade_UnifySameDomain
+    from build123d import Shape
+
+    faces, edges = len(shape.faces()), len(shape.edges())
+
+    upgrade = ShapeUpgrade_UnifySameDomain(shape.wrapped, True, True, True)
+    upgrade.AllowInternalEdges(False)
+    upgrade.Build()
+    result = upgrade.Shape()
+    if heal:
+        fix = ShapeFix_Shape(result)
+        fix.Perform()
+        result = fix.Shape()
+    result = Shape.cast(result)
+
+    volume = shape.volume
+    if not result.is_valid() or abs(result.volume - volume) > VOLUME_TOLERANCE * max(abs(volume), 1):
+        return shape, CleanupReport(faces, faces, edges, edges, applied=False)
+    return result, CleanupReport(faces, len(result.faces()), edges, len(result.edges()))
@@ -0,0 +1,437 @@
+""" clearance between the case and the components of a KiCad board
+
+Hotswap sockets, the controller and the USB receptacle are taken from the
+board (see kicad.py) as boxes in case coordinates, the case as a triangle
+mesh of the built parts or of exported STL files. For every component the
+smallest distance to the case is computed with NumPy:
+
+* candidate triangles are found with an AABB query around the box,
+* a separating axis test marks triangles intersecting the box,
+* the distance of the others is the minimum over vertex-box, box corner-
+  triangle and edge-edge distances, which is exact for two convex bodies.
+
+Components below the PCB are also measured against the build plate (Z=0),
+an open bottom case with sockets below it would rock on them. The PCB itself
+is checked in horizontal sections of the mesh against the Edge.Cuts outline.
+USB connectors get a plug envelope in front of the opening running through
+the case wall (+Y), so a cutout in the wrong place shows up as an overlap.
+
+The PCB top is assumed at ``heightBelowPlate``, the reference the USB
+cutout is placed from (``usbZOffset``). Heights not on the board are the
+estimates in BODIES.
+
+Usage::
+
+    python -m grumpy_case.interference lp --board ../grumpy_ch552t/grumpy_ch522t.kicad_pcb \\
+        --stl "../prod/MX ChocV2 low profile/case_chocV2/grumpy_lp.stl"
+
+The released files of the presets in SHIPPED are checked with::
+
+    python -m grumpy_case.interference --shipped
+"""
+
+import argparse
+import math
+import os
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .geometry import dot, point_segment, point_triangle, segment_segment
+from .kicad import case_transform, load_board
+from .params import PRESETS
+
+# opening of a USB-C receptacle (width, height)
+USB_MOUTH = (8.94, 3.26)
+# length of the plug envelope in front of the receptacle
+PLUG_DEPTH = 12
+# clearances larger than this are not measured and reported as inf
+REACH = 5
+
+REPO_DIR = Path(__file__).resolve().parent.parent.parent
+_PROD = REPO_DIR / "prod"
+# released configurations checked by --shipped: preset -> (board, case STL
+# files), the inset bottom of lp is left out like in case_triangles
+SHIPPED = {
+    "lp": (REPO_DIR / "grumpy_ch552t" / "grumpy_ch522t.kicad_pcb",
+           (_PROD / "MX ChocV2 low profile" / "case_chocV2" / "grumpy_lp.stl",)),
+    "mx": (REPO_DIR / "grumpy_xiao" / "grumpy.kicad_pcb",
+           (_PROD / "MX Xiao" / "case_mx" / "grumpy.stl",)),
+}
+
+
+class Body(NamedTuple):
+    kind: str
+    pattern: str      # regex matched against the footprint name
+    outlines: tuple   # footprint outlines spanning the body, see kicad.PcbFootprint
+    below: float      # height below the PCB bottom, None for params.hsThickness
+    above: float      # height above the PCB top
+    width: float      # across the footprint X axis, None for the outline width
+    mouth: float      # USB opening center relative to the PCB top, None without USB
+
+
+# a mid-mount receptacle is centered on a 1.6mm board
+_MIDMOUNT = (USB_MOUTH[1] - 1.6) / 2
+
+BODIES = (
+    Body("socket", r"Hotswap", ("pads",), None, 0, None, None),
+    # module soldered to the back, its receptacle sits in a board cutout
+    Body("controller", r"xiao", ("pads", "drawing"), 1.2, 0, None, 0),
+    # shell outline only, the SMD tails behind it are flat on the board and
+    # the drawing also marks the board edge
+    Body("usb", r"USB", ("drawing",), _MIDMOUNT, _MIDMOUNT, USB_MOUTH[0], -0.8),
+    Body("button", r"TL3342", ("courtyard",), 1.5, 0, None, None),
+)
+
+
+class Box(NamedTuple):
+    kind: str
+    ref: str
+    center: tuple     # x, y, z in case coordinates
+    half: tuple       # half extents along the box axes
+    angle: float      # rotation around Z in degrees
+
+
+class Clearance(NamedTuple):
+    kind: str
+    ref: str
+    clearance: float  # mm to the case, 0 if overlapping, inf if more than REACH
+    overlap: bool
+    x: float
+    y: float
+
+## ------------------------------------------------------------------------------
+# meshes
+
+_STL = np.dtype([("normal", "<3f4"), ("vertices", "<9f4"), ("attr", "<u2")])
+
+
+def load_stl(path):
+    """ reads a binary STL file
+
+    :return float array (N, 3, 3) of triangle vertices
+    """
+    records = np.fromfile(path, dtype=_STL, offset=84)
+    return records["vertices"].reshape(-1, 3, 3).astype(np.float64)
+
+
+def case_triangles(case, profile="draft"):
+    """ meshes the full case and the bottom plate of a CaseBuild
+
+    The plate of the "inset" style is built at Z=0 of the case, where the
+    sockets are, while it is mounted below them. It is left out, only the
+    "plate" style bottom part is modeled in its assembled position.
+
+    :return float array (N, 3, 3) of triangle vertices
+    """
+    from .export import deflection, iter_triangles
+
+    tolerance, angular = deflection(profile)
+    parts = [case.full]
+    if case.params.bottomStyle != "inset":
+        parts.append(case.bottomPlate)
+    tris = [t for part in parts if part is not None
+            for t in iter_triangles(part, tolerance, angular)]
+    return np.array(tris, dtype=np.float64).reshape(-1, 3, 3)
+
+## ------------------------------------------------------------------------------
+# components
+
+def _zRange(body, params):
+    pcbTop = params.heightBelowPlate
+    pcbBottom = pcbTop - params.pcbThickness
+    below = params.hsThickness if body.below is None else body.below
+    return pcbBottom - below, (pcbTop + body.above) if body.above else pcbBottom
+
+
+def component_boxes(board, params, usbZ=0):
+    """ converts the components in BODIES into boxes in case coordinates
+
+    :param usbZ: additional Z offset of the USB plugs
+    :return list of Box, plug envelopes have kind "plug"
+    """
+    transform = case_transform(board, params)
+    boxes = []
+    for fp in board.footprints:
+        body = next((b for b in BODIES if re.search(b.pattern, fp.footprint, re.IGNORECASE)), None)
+        if body is None:
+            continue
+        outlines = [fp.outlines[key] for key in body.outlines if key in fp.outlines]
+        if not outlines:
+            continue
+        x0, y0 = min(o[0] for o in outlines), min(o[1] for o in outlines)
+        x1, y1 = max(o[2] for o in outlines), max(o[3] for o in outlines)
+        if body.width is not None:
+            x0, x1 = (x0 + x1 - body.width) / 2, (x0 + x1 + body.width) / 2
+        cx, cy = transform(*fp.to_board((x0 + x1) / 2, (y0 + y1) / 2))
+        # Y is flipped, so board angles stay counter clockwise in case coordinates
+        angle = fp.angle
+        z0, z1 = _zRange(body, params)
+        boxes.append(Box(body.kind, fp.ref, (cx, cy, (z0 + z1) / 2),
+                         ((x1 - x0) / 2, (y1 - y0) / 2, (z1 - z0) / 2), angle))
+
+        if body.mouth is not None:
+            # from the body center to PLUG_DEPTH in front of its +Y side
+            a = math.radians(angle)
+            front = abs((x1 - x0) / 2 * math.sin(a)) + abs((y1 - y0) / 2 * math.cos(a))
+            length = front + PLUG_DEPTH
+            z = params.heightBelowPlate + body.mouth + usbZ
+            boxes.append(Box("plug", fp.ref, (cx, cy + length / 2, z),
+                             (USB_MOUTH[0] / 2, length / 2, USB_MOUTH[1] / 2), 0))
+    return boxes
+
+## ------------------------------------------------------------------------------
+# box tests
+
+_AXES = np.eye(3)
+_CORNERS = np.array([(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)], dtype=np.float64)
+_EDGES = [(i, j) for i in range(8) for j in range(i + 1, 8)
+          if np.count_nonzero(_CORNERS[i] != _CORNERS[j]) == 1]
+
+
+def tri_box_overlap(tris, half):
+    """ separating axis test of triangles against an axis aligned box at the origin
+
+    :param tris: (N, 3, 3) triangles in box coordinates
+    :param half: half extents of the box
+    :return bool array (N,)
+    """
+    half = np.asarray(half, dtype=np.float64)
+    separated = (tris.min(axis=1) > half).any(-1) | (tris.max(axis=1) < -half).any(-1)
+
+    f = np.roll(tris, -1, axis=1) - tris                      # edges (N, 3, 3)
+    n = np.cross(f[:, 0], f[:, 1])
+    separated |= np.abs(dot(n, tris[:, 0])) > np.abs(n) @ half
+
+    axes = np.cross(_AXES[None, :, None, :], f[:, None, :, :])  # (N, 3 box, 3 edges, 3)
+    proj = np.einsum("nkjc,nic->nkji", axes, tris)
+    r = np.abs(axes) @ half
+    separated |= ((proj.min(-1) > r) | (proj.max(-1) < -r)).any((1, 2))
+    return ~separated
+
+
+def tri_box_distance(tris, half):
+    """ distance of triangles to an axis aligned box at the origin, 0 if they overlap
+
+    :param tris: (N, 3, 3) triangles in box coordinates
+    :return float array (N,)
+    """
+    half = np.asarray(half, dtype=np.float64)
+    # triangle vertices to the box
+    d = np.linalg.norm(np.maximum(np.abs(tris) - half, 0), axis=-1).min(-1)
+    # box corners to the triangles
+    corners = _CORNERS * half
+    a, b, c = (tris[:, None, i] for i in range(3))
+    d = np.minimum(d, point_triangle(corners[None], a, b, c).min(-1))
+    # box edges to triangle edges
+    p = corners[[i for i, _ in _EDGES]]
+    q = corners[[j for _, j in _EDGES]]
+    t0, t1 = tris, np.roll(tris, -1, axis=1)
+    dist = segment_segment(p[None, :, None], q[None, :, None], t0[:, None], t1[:, None])
+    d = np.minimum(d, dist.min((1, 2)))
+    return np.where(tri_box_overlap(tris, half), 0.0, d)
+
+
+class CaseMesh:
+    def __init__(self, triangles):
+        """
+        :param triangles: (N, 3, 3) array, see load_stl and case_triangles
+        """
+        self.triangles = np.asarray(triangles, dtype=np.float64)
+        self.lo = self.triangles.min(axis=1)
+        self.hi = self.triangles.max(axis=1)
+
+    def box_clearance(self, box, reach=REACH):
+        """ :return (clearance, overlap) of a Box, clearance inf beyond reach """
+        a = math.radians(box.angle)
+        c, s = math.cos(a), math.sin(a)
+        half = np.asarray(box.half, dtype=np.float64)
+        # world AABB of the rotated box
+        ext = np.array((abs(c) * half[0] + abs(s) * half[1], abs(s) * half[0] + abs(c) * half[1], half[2]))
+        center = np.asarray(box.center, dtype=np.float64)
+        near = ((self.lo <= center + ext + reach) & (self.hi >= center - ext - reach)).all(-1)
+        if not near.any():
+            return math.inf, False
+
+        local = self.triangles[near] - center
+        rot = np.array(((c, s, 0), (-s, c, 0), (0, 0, 1)))
+        local = local @ rot.T
+        d = tri_box_distance(local, half).min()
+        return (float(d), bool(d == 0)) if d <= reach else (math.inf, False)
+
+    def section(self, z):
+        """ cuts the mesh at height z
+
+        :return (M, 2, 2) array of 2D segments
+        """
+        tris = self.triangles[(self.lo[:, 2] < z) & (self.hi[:, 2] > z)]
+        above = tris[:, :, 2] > z
+        segs = []
+        for i in range(3):
+            a, b = tris[:, i], tris[:, (i + 1) % 3]
+            cross = above[:, i] != above[:, (i + 1) % 3]
+            t = (z - a[:, 2]) / np.where(cross, b[:, 2] - a[:, 2], 1)
+            segs.append(np.where(cross[:, None], a[:, :2] + (b[:, :2] - a[:, :2]) * t[:, None], np.nan))
+        pnts = np.stack(segs, axis=1)                       # (M, 3, 2), one nan per triangle
+        valid = ~np.isnan(pnts[:, :, 0])
+        keep = valid.sum(1) == 2
+        pnts, valid = pnts[keep], valid[keep]
+        order = np.argsort(~valid, axis=1, kind="stable")[:, :2]
+        return np.take_along_axis(pnts, order[:, :, None], axis=1)
+
+
+def _inside(pnts, segs):
+    """ even odd test of points (N, 2) against the closed polygon segs (M, 2, 2) """
+    x, y = pnts[:, None, 0], pnts[:, None, 1]
+    x1, y1, x2, y2 = (segs[None, :, i, k] for i in (0, 1) for k in (0, 1))
+    crosses = (y1 > y) != (y2 > y)
+    xs = x1 + (y - y1) * (x2 - x1) / np.where(y2 != y1, y2 - y1, 1)
+    return (crosses & (x < xs)).sum(1) % 2 == 1
+
+
+def _segmentsIntersect(a, b):
+    """ :return True if any segment of a (N, 2, 2) crosses any of b (M, 2, 2) """
+    def orient(p, q, r):
+        return np.sign((q[..., 0] - p[..., 0]) * (r[..., 1] - p[..., 1])
+                       - (q[..., 1] - p[..., 1]) * (r[..., 0] - p[..., 0]))
+    p, q = a[:, None, 0], a[:, None, 1]
+    r, s = b[None, :, 0], b[None, :, 1]
+    return bool(((orient(p, q, r) * orient(p, q, s) < 0) & (orient(r, s, p) * orient(r, s, q) < 0)).any())
+
+
+def _segmentsDistance(a, b, reach):
+    """ smallest distance between the segments a (N, 2, 2) and b (M, 2, 2),
+    only pairs whose bounding boxes are closer than reach are measured
+
+    Disjoint segments are closest at one of their end points.
+    """
+    aLo, aHi, bLo, bHi = a.min(1), a.max(1), b.min(1), b.max(1)
+    near = ((aLo[:, None] <= bHi[None] + reach) & (aHi[:, None] >= bLo[None] - reach)).all(-1)
+    i, j = np.nonzero(near)
+    if not len(i):
+        return math.inf
+    a, b = a[i], b[j]
+    d = np.minimum(np.minimum(point_segment(a[:, 0], b[:, 0], b[:, 1]), point_segment(a[:, 1], b[:, 0], b[:, 1])),
+                   np.minimum(point_segment(b[:, 0], a[:, 0], a[:, 1]), point_segment(b[:, 1], a[:, 0], a[:, 1])))
+    return float(d.min())
+
+
+def pcb_clearance(mesh, board, params, reach=REACH):
+    """ distance of the PCB edge to the case, in sections just inside the
+    PCB top and bottom
+
+    :return (clearance, overlap)
+    """
+    transform = case_transform(board, params)
+    outline = np.array([(transform(x1, y1), transform(x2, y2)) for x1, y1, x2, y2 in board.edges])
+    pcbTop = params.heightBelowPlate
+    best = math.inf
+    for z in (pcbTop - 0.05, pcbTop - params.pcbThickness + 0.05):
+        segs = mesh.section(z)
+        if not len(segs):
+            continue
+        lo, hi = outline.reshape(-1, 2).min(0) - reach, outline.reshape(-1, 2).max(0) + reach
+        segs = segs[((segs.min(1) <= hi) & (segs.max(1) >= lo)).all(-1)]
+        if not len(segs):
+            continue
+        # case material inside the board outline or crossing it
+        if _inside(segs.reshape(-1, 2), outline).any() or _segmentsIntersect(outline, segs):
+            return 0.0, True
+        best = min(best, _segmentsDistance(outline, segs, reach))
+    return (best, False) if best <= reach else (math.inf, False)
+
+## ------------------------------------------------------------------------------
+
+def check(params, board, triangles, usbZ=0, reach=REACH):
+    """ measures the clearance of all board components to the case
+
+    :param params: CaseParams the case was built from
+    :param board: kicad.Board or path of a .kicad_pcb file
+    :param triangles: (N, 3, 3) array or CaseMesh
+    :param usbZ: additional Z offset of the USB plugs
+    :return list of Clearance, smallest first
+    """
+    if isinstance(board, (str, os.PathLike)):
+        board = load_board(board)
+    mesh = triangles if isinstance(triangles, CaseMesh) else CaseMesh(triangles)
+
+    result = []
+    for box in component_boxes(board, params, usbZ):
+        clearance, overlap = mesh.box_clearance(box, reach)
+        if box.kind != "plug":
+            # distance to the build plate / table
+            bottom = box.center[2] - box.half[2]
+            if bottom <= 0:
+                clearance, overlap = 0.0, True
+            elif bottom < clearance:
+                clearance = bottom
+        result.append(Clearance(box.kind, box.ref, clearance, bool(overlap), box.center[0], box.center[1]))
+
+    clearance, overlap = pcb_clearance(mesh, board, params, reach)
+    result.append(Clearance("pcb", "Edge.Cuts", clearance, overlap, 0.0, 0.0))
+    result.sort(key=lambda c: (not c.overlap, c.clearance))
+    return result
+
+
+def check_shipped(names=None):
+    """ checks the released case files against their boards, see SHIPPED
+
+    :param names: presets to check, default all in SHIPPED
+    :return dict preset name -> list of Clearance
+    """
+    result = {}
+    for name in names or SHIPPED:
+        board, stls = SHIPPED[name]
+        triangles = np.concatenate([load_stl(path) for path in stls])
+        result[name] = check(PRESETS[name], board, triangles)
+    return result
+
+
+def _print(result, everything=False):
+    for c in result if everything else [c for c in result if c.overlap or c.clearance < 1] or result[:5]:
+        state = "OVERLAP" if c.overlap else f"{c.clearance:.2f}mm"
+        print(f"{c.kind:10} {c.ref or '':10} ({c.x:7.2f}, {c.y:6.2f})  {state}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="clearance between a case and the components of its PCB")
+    parser.add_argument("preset", nargs="?", choices=sorted(PRESETS))
+    parser.add_argument("--board", help=".kicad_pcb file")
+    parser.add_argument("--shipped", action="store_true",
+                        help=f"check the released files of {', '.join(sorted(SHIPPED))} instead")
+    parser.add_argument("--stl", action="append",
+                        help="case STL file(s) (repeatable), the case is built if omitted")
+    parser.add_argument("--usb-z", type=float, default=0, help="moves the USB plugs up")
+    parser.add_argument("--all", action="store_true", help="list every component")
+    args = parser.parse_args(argv)
+
+    if args.shipped:
+        if args.preset and args.preset not in SHIPPED:
+            parser.error(f"no released files of {args.preset}")
+        results = check_shipped([args.preset] if args.preset else None)
+        for name, result in results.items():
+            print(f"{name}:")
+            _print(result, args.all)
+        if any(c.overlap for result in results.values() for c in result):
+            raise SystemExit(1)
+        return
+    if not args.preset or not args.board:
+        parser.error("preset and --board are required without --shipped")
+
+    params = PRESETS[args.preset]
+    if args.stl:
+        triangles = np.concatenate([load_stl(path) for path in args.stl])
+    else:
+        from .build import build_case
+        triangles = case_triangles(build_case(params))
+
+    result = check(params, args.board, triangles, args.usb_z)
+    _print(result, args.all)
+    if any(c.overlap for c in result):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
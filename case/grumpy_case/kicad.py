@@ -0,0 +1,497 @@
+""" switch positions and board outline read from KiCad ``.kicad_pcb`` files
+
+The boards are S-expression files of several megabytes, almost all of it
+pads, tracks and silkscreen. They are tokenized line by line and only the
+footprint placement (``at``, layer and reference) and the ``Edge.Cuts``
+graphics are kept, everything else is skipped without building a tree.
+
+The result is cached as a small binary file named after the SHA-256 of the
+board, so a board is parsed once until it is changed in KiCad::
+
+    board = load_board("../grumpy_choc/grumpy_choc.kicad_pcb")
+    board.switches[0]   # PcbSwitch(ref='SW1', x=..., y=..., angle=..., ...)
+
+Coordinates are KiCad's: millimeters, Y pointing down, angles counter
+clockwise as seen in pcbnew. ``case_switches`` converts them into the case
+coordinate system of ``layout.getSwitches``. A case is built from the
+switches of a board with ``CaseParams.layoutBoard``, see ``hand_points``.
+
+Usage: ``python -m grumpy_case.kicad ../grumpy_choc/grumpy_choc.kicad_pcb --compare choc``
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+from typing import NamedTuple
+
+from .cache import DEFAULT_PATH
+from .layout import Switch, getSwitches
+from .params import PRESETS
+
+# footprint names of key switches
+SWITCH_FOOTPRINT = re.compile(r"(Hotswap|CherryMX|Choc|Kailh)", re.IGNORECASE)
+
+# segments per full circle when arcs and circles are flattened
+ARC_SEGMENTS = 72
+
+_MAGIC = b"GPCB"
+_VERSION = 2
+_TOKEN = re.compile(r'[()]|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+
+class PcbSwitch(NamedTuple):
+    ref: str          # reference designator, e.g. "SW14"
+    footprint: str
+    x: float
+    y: float
+    angle: float
+    back: bool        # placed on B.Cu
+
+
+class PcbFootprint(NamedTuple):
+    ref: str
+    footprint: str
+    x: float
+    y: float
+    angle: float
+    back: bool
+    outlines: dict    # "pads", "courtyard", "drawing" -> footprint local (xmin, ymin, xmax, ymax)
+
+    def to_board(self, lx, ly):
+        """ transforms a footprint local point into board coordinates """
+        a = math.radians(self.angle)
+        return (self.x + lx*math.cos(a) + ly*math.sin(a),
+                self.y - lx*math.sin(a) + ly*math.cos(a))
+
+
+class Board(NamedTuple):
+    path: str
+    sha256: str
+    switches: list    # PcbSwitch sorted by reference
+    edges: list       # Edge.Cuts as (x1, y1, x2, y2) segments, arcs flattened
+    footprints: list = []  # all PcbFootprint, in file order
+
+    def bounds(self):
+        """ :return (xmin, ymin, xmax, ymax) of the board outline """
+        xs = [x for e in self.edges for x in e[0::2]]
+        ys = [y for e in self.edges for y in e[1::2]]
+        return min(xs), min(ys), max(xs), max(ys)
+
+## ------------------------------------------------------------------------------
+# tokenizer and parser
+
+def tokenize(lines):
+    """ yields "(", ")" and atoms, strings are unquoted
+
+    KiCad escapes newlines inside strings, so every token is on one line.
+
+    :param lines: iterable of text lines, e.g. an open file
+    """
+    for line in lines:
+        for tok in _TOKEN.findall(line):
+            if tok[0] == '"':
+                yield tok[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+            else:
+                yield tok
+
+
+def _skip(tokens):
+    """ consumes the rest of the current list, the opening "(" is already read """
+    depth = 1
+    for tok in tokens:
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+            if not depth:
+                return
+
+
+def _read(tokens, keep=None):
+    """ reads the rest of the current list into nested python lists
+
+    :param keep: set of heads of the nested lists to read, others are skipped.
+        None reads all
+    """
+    node = []
+    for tok in tokens:
+        if tok == ")":
+            return node
+        if tok == "(":
+            head = next(tokens)
+            if keep is None or head in keep:
+                node.append([head] + _read(tokens, keep))
+            else:
+                _skip(tokens)
+        else:
+            node.append(tok)
+    return node
+
+
+def _child(node, head):
+    for item in node:
+        if isinstance(item, list) and item[0] == head:
+            return item
+    return None
+
+
+def _point(node, head):
+    item = _child(node, head)
+    return float(item[1]), float(item[2])
+
+
+def _angle(at):
+    return float(at[3]) if len(at) > 3 and at[3] != "unlocked" else 0.0
+
+
+def _padCorners(pad, fpAngle):
+    """ corners of a pad in footprint coordinates, pad angles are absolute """
+    at, size = _child(pad, "at"), _child(pad, "size")
+    lx, ly = float(at[1]), float(at[2])
+    w, h = float(size[1]), float(size[2])
+    a = math.radians(_angle(at) - fpAngle)
+    c, s = math.cos(a), math.sin(a)
+    return [(lx + dx*c + dy*s, ly - dx*s + dy*c)
+            for dx, dy in ((-w/2, -h/2), (w/2, -h/2), (w/2, h/2), (-w/2, h/2))]
+
+
+def _graphicPoints(item):
+    """ points spanning a footprint graphic, circles as their bounding box """
+    if item[0] == "fp_circle":
+        (cx, cy), (x, y) = _point(item, "center"), _point(item, "end")
+        r = math.hypot(x-cx, y-cy)
+        return [(cx-r, cy-r), (cx+r, cy+r)]
+    if item[0] == "fp_poly":
+        return [(float(xy[1]), float(xy[2])) for xy in _child(item, "pts")[1:] if xy[0] == "xy"]
+    return [_point(item, head) for head in ("start", "mid", "end") if _child(item, head)]
+
+
+def _bbox(pnts):
+    if not pnts:
+        return None
+    xs, ys = [p[0] for p in pnts], [p[1] for p in pnts]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+# footprint graphic layers -> outline name
+_OUTLINE_LAYERS = {"F.CrtYd": "courtyard", "B.CrtYd": "courtyard",
+                   "Dwgs.User": "drawing", "Cmts.User": "drawing"}
+
+
+def _footprint(node):
+    """ :return PcbFootprint """
+    name = node[0]
+    at = _child(node, "at")
+    angle = _angle(at)
+    ref = None
+    pnts = {"pads": [], "courtyard": [], "drawing": []}
+    for item in node:
+        if not isinstance(item, list):
+            continue
+        # KiCad 6/7: (fp_text reference "SW1" ...), KiCad 8: (property "Reference" "SW1" ...)
+        if item[0] == "fp_text" and item[1] == "reference":
+            ref = item[2]
+        elif item[0] == "property" and item[1] == "Reference":
+            ref = item[2]
+        elif item[0] == "pad" and item[2] in ("smd", "thru_hole"):
+            pnts["pads"].extend(_padCorners(item, angle))
+        elif item[0].startswith("fp_") and item[0] != "fp_text":
+            layer = _child(item, "layer")
+            if layer and layer[1] in _OUTLINE_LAYERS:
+                pnts[_OUTLINE_LAYERS[layer[1]]].extend(_graphicPoints(item))
+    layer = _child(node, "layer")
+    outlines = {key: _bbox(p) for key, p in pnts.items() if p}
+    return PcbFootprint(ref, name, float(at[1]), float(at[2]), angle,
+                        bool(layer) and layer[1] == "B.Cu", outlines)
+
+
+def _arc(start, mid, end):
+    """ flattens the arc through three points into segments """
+    (x1, y1), (x2, y2), (x3, y3) = start, mid, end
+    d = 2 * (x1*(y2-y3) + x2*(y3-y1) + x3*(y1-y2))
+    if abs(d) < 1e-12:
+        return [(x1, y1, x3, y3)]
+    cx = ((x1*x1+y1*y1)*(y2-y3) + (x2*x2+y2*y2)*(y3-y1) + (x3*x3+y3*y3)*(y1-y2)) / d
+    cy = ((x1*x1+y1*y1)*(x3-x2) + (x2*x2+y2*y2)*(x1-x3) + (x3*x3+y3*y3)*(x2-x1)) / d
+    r = math.hypot(x1-cx, y1-cy)
+    a1, a2, a3 = (math.atan2(y-cy, x-cx) for x, y in (start, mid, end))
+    # sweep from start over mid to end
+    sweep = (a3 - a1) % (2*math.pi)
+    if (a2 - a1) % (2*math.pi) > sweep:
+        sweep -= 2*math.pi
+    n = max(1, math.ceil(abs(sweep) / (2*math.pi) * ARC_SEGMENTS))
+    pnts = [(cx + r*math.cos(a1 + sweep*i/n), cy + r*math.sin(a1 + sweep*i/n)) for i in range(n+1)]
+    pnts[0], pnts[-1] = start, end
+    return [(*a, *b) for a, b in zip(pnts, pnts[1:])]
+
+
+def _edgeCuts(node):
+    """ :return list of (x1, y1, x2, y2) segments of a board graphic item """
+    head = node[0]
+    if head == "gr_line":
+        return [(*_point(node, "start"), *_point(node, "end"))]
+    if head == "gr_arc":
+        if _child(node, "mid") is None:
+            # KiCad 5: (start center) (end first point) (angle degrees)
+            cx, cy = _point(node, "start")
+            x, y = _point(node, "end")
+            a = math.radians(float(_child(node, "angle")[1]))
+            h = a / 2
+            mid = (cx + (x-cx)*math.cos(h) - (y-cy)*math.sin(h), cy + (x-cx)*math.sin(h) + (y-cy)*math.cos(h))
+            end = (cx + (x-cx)*math.cos(a) - (y-cy)*math.sin(a), cy + (x-cx)*math.sin(a) + (y-cy)*math.cos(a))
+            return _arc((x, y), mid, end)
+        return _arc(_point(node, "start"), _point(node, "mid"), _point(node, "end"))
+    if head == "gr_circle":
+        cx, cy = _point(node, "center")
+        x, y = _point(node, "end")
+        r = math.hypot(x-cx, y-cy)
+        pnts = [(cx + r*math.cos(2*math.pi*i/ARC_SEGMENTS), cy + r*math.sin(2*math.pi*i/ARC_SEGMENTS))
+                for i in range(ARC_SEGMENTS+1)]
+        return [(*a, *b) for a, b in zip(pnts, pnts[1:])]
+    if head == "gr_rect":
+        (x1, y1), (x2, y2) = _point(node, "start"), _point(node, "end")
+        pnts = [(x1, y1), (x2, y1), (x2, y2), (x1, y2), (x1, y1)]
+        return [(*a, *b) for a, b in zip(pnts, pnts[1:])]
+    if head == "gr_poly":
+        pnts = [(float(xy[1]), float(xy[2])) for xy in _child(node, "pts")[1:] if xy[0] == "xy"]
+        pnts.append(pnts[0])
+        return [(*a, *b) for a, b in zip(pnts, pnts[1:])]
+    return []
+
+
+_FOOTPRINT_KEEP = {"at", "layer", "fp_text", "property", "pad", "size",
+                   "fp_line", "fp_rect", "fp_poly", "fp_circle", "fp_arc",
+                   "start", "mid", "end", "center", "pts", "xy"}
+_GRAPHIC_KEEP = {"start", "mid", "end", "center", "angle", "layer", "pts", "xy"}
+_GRAPHICS = {"gr_line", "gr_arc", "gr_circle", "gr_rect", "gr_poly"}
+
+
+def parse_board(lines):
+    """ extracts the footprints and the Edge.Cuts outline from a board file
+
+    :param lines: iterable of text lines
+    :return (list of PcbSwitch, list of edge segments, list of PcbFootprint)
+    """
+    tokens = tokenize(lines)
+    if next(tokens, None) != "(" or next(tokens, None) != "kicad_pcb":
+        raise ValueError("not a kicad_pcb file")
+
+    footprints, edges = [], []
+    for tok in tokens:
+        if tok == ")":
+            break
+        if tok != "(":
+            continue
+        head = next(tokens)
+        # KiCad 5 called footprints "module"
+        if head in ("footprint", "module"):
+            footprints.append(_footprint(_read(tokens, _FOOTPRINT_KEEP)))
+        elif head in _GRAPHICS:
+            node = [head] + _read(tokens, _GRAPHIC_KEEP)
+            layer = _child(node, "layer")
+            if layer and layer[1] == "Edge.Cuts":
+                edges.extend(_edgeCuts(node))
+        else:
+            _skip(tokens)
+
+    switches = [PcbSwitch(fp.ref, fp.footprint, fp.x, fp.y, fp.angle, fp.back)
+                for fp in footprints if SWITCH_FOOTPRINT.search(fp.footprint)]
+    switches.sort(key=lambda sw: (len(sw.ref or ""), sw.ref or ""))
+    return switches, edges, footprints
+
+## ------------------------------------------------------------------------------
+# cache
+
+def _dump(switches, edges, footprints):
+    # strings in a json header, all numbers in one array of doubles
+    header = json.dumps({
+        "switches": [(sw.ref, sw.footprint, sw.back) for sw in switches],
+        "footprints": [(fp.ref, fp.footprint, fp.back, list(fp.outlines)) for fp in footprints],
+    }).encode()
+    values = array("d", (v for sw in switches for v in (sw.x, sw.y, sw.angle)))
+    values.extend(v for e in edges for v in e)
+    for fp in footprints:
+        values.extend((fp.x, fp.y, fp.angle))
+        values.extend(v for box in fp.outlines.values() for v in box)
+    return (_MAGIC + struct.pack("<HII", _VERSION, len(header), len(edges))
+            + header + values.tobytes())
+
+
+def _load(data):
+    if data[:4] != _MAGIC:
+        raise ValueError("not a board cache file")
+    version, headerSize, nEdges = struct.unpack_from("<HII", data, 4)
+    if version != _VERSION:
+        raise ValueError(f"board cache version {version}")
+    pos = 4 + struct.calcsize("<HII")
+    header = json.loads(data[pos:pos+headerSize])
+    values = array("d")
+    values.frombytes(data[pos+headerSize:])
+    values = iter(values)
+
+    def take(n):
+        return tuple(next(values) for _ in range(n))
+
+    switches = [PcbSwitch(ref, fp, *take(3), back) for ref, fp, back in header["switches"]]
+    edges = [take(4) for _ in range(nEdges)]
+    footprints = [PcbFootprint(ref, fp, *take(3), back, {key: take(4) for key in outlines})
+                  for ref, fp, back, outlines in header["footprints"]]
+    return switches, edges, footprints
+
+
+def board_sha256(path):
+    """ content hash of a board file, the key of its cache entry """
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def load_board(path, cacheDir=DEFAULT_PATH / "pcb"):
+    """ reads a board, from the cache if it was parsed before
+
+    :param path: .kicad_pcb file
+    :param cacheDir: directory of the parsed boards, None disables caching
+    :return Board
+    """
+    path = Path(path)
+    data = path.read_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+
+    cached = Path(cacheDir) / f"{sha}.bin" if cacheDir is not None else None
+    if cached is not None:
+        try:
+            return Board(str(path), sha, *_load(cached.read_bytes()))
+        except Exception:
+            # missing, truncated or corrupt, parsed again below
+            pass
+
+    parsed = parse_board(data.decode("utf-8").splitlines())
+    if cached is not None:
+        _store(cached, _dump(*parsed))
+    return Board(str(path), sha, *parsed)
+
+
+def _store(path, data):
+    """ writes a cache file atomically, a cache that can't be written is skipped """
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            Path(tmp).unlink(missing_ok=True)
+
+## ------------------------------------------------------------------------------
+
+def _center(pnts):
+    xs, ys = [p[0] for p in pnts], [p[1] for p in pnts]
+    return (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+
+
+def case_transform(board, params=None):
+    """ transform of board into case coordinates
+
+    X = 0 is put on the middle between the hands, Y points up. The board has
+    no notion of the case outline, so Y is centered on the switches, or, if
+    params are given, aligned to the computed switches of ``layout.getSwitches``
+    (ignoring ``layoutBoard``).
+
+    :return function (x, y) -> (x, y)
+    """
+    cx, cy = _center([(sw.x, -sw.y) for sw in board.switches])
+    if params is not None:
+        cy -= _center(getSwitches(params.replace(layoutBoard=None)))[1]
+
+    def transform(x, y):
+        return x - cx, -y - cy
+    return transform
+
+
+def case_switches(board, params=None):
+    """ converts the switches of a board into case coordinates, see
+    case_transform. Angles are taken modulo 180 degrees, the lowest switch of
+    each hand is the thumb key.
+
+    :param params: optional CaseParams to align to
+    :return list of layout.Switch, right hand first, each hand sorted by reference
+    """
+    transform = case_transform(board, params)
+    switches = []
+    for sw in board.switches:
+        x, y = transform(sw.x, sw.y)
+        angle = (sw.angle + 90) % 180 - 90
+        switches.append(Switch(x, y, angle, "right" if x > 0 else "left", False))
+    for hand in ("right", "left"):
+        i = min((i for i, sw in enumerate(switches) if sw.hand == hand), key=lambda i: switches[i].y)
+        switches[i] = switches[i]._replace(thumb=True)
+    switches.sort(key=lambda sw: sw.hand != "right")
+    return switches
+
+
+def hand_points(board, params):
+    """ right hand switch positions of a board in the layout system of
+    ``layout.getAlphaKeyPos`` (before handAngle and partXOffset are applied),
+    used for the layout of ``CaseParams.layoutBoard``. The switch angles of the
+    board are not used, the hands keep ``handAngle``.
+
+    :return (alpha points, thumb points), lists of x y tuples
+    """
+    a = math.radians(-params.handAngle)
+    alpha, thumb = [], []
+    for sw in case_switches(board, params):
+        if sw.hand != "right":
+            continue
+        x, y = sw.x - params.partXOffset, sw.y
+        pnt = (x*math.cos(a) - y*math.sin(a), x*math.sin(a) + y*math.cos(a))
+        (thumb if sw.thumb else alpha).append(pnt)
+    return alpha, thumb
+
+
+def layout_deviation(board, params):
+    """ compares the switches of a board with the computed layout
+
+    :return list of (distance, angle difference, layout Switch, board Switch),
+        largest distance first
+    """
+    result = []
+    pcb = case_switches(board, params)
+    for sw in getSwitches(params):
+        near = min(pcb, key=lambda o: math.hypot(o.x - sw.x, o.y - sw.y))
+        result.append((math.hypot(near.x - sw.x, near.y - sw.y), near.angle - sw.angle, sw, near))
+    result.sort(key=lambda r: -r[0])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="list the key switches and outline of a KiCad board")
+    parser.add_argument("board", help=".kicad_pcb file")
+    parser.add_argument("--no-cache", action="store_true", help="always parse the board file")
+    parser.add_argument("--compare", choices=sorted(PRESETS), help="compare with the layout of a preset")
+    args = parser.parse_args(argv)
+
+    board = load_board(args.board, None if args.no_cache else DEFAULT_PATH / "pcb")
+    for sw in board.switches:
+        side = "back" if sw.back else "front"
+        print(f"{sw.ref:6} {sw.x:10.4f} {sw.y:10.4f} {sw.angle:8.2f}  {side:5}  {sw.footprint}")
+    xmin, ymin, xmax, ymax = board.bounds()
+    print(f"{len(board.switches)} switches, {len(board.edges)} outline segments, "
+          f"{xmax-xmin:.2f} x {ymax-ymin:.2f} mm")
+
+    if args.compare:
+        deviation = layout_deviation(board, PRESETS[args.compare])
+        dist, _, sw, _ = deviation[0]
+        angle = max(abs(r[1]) for r in deviation)
+        print(f"largest deviation from {args.compare}: {dist:.3f}mm at ({sw.x:.2f}, {sw.y:.2f}), "
+              f"angle {angle:.2f} deg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+""" switch layout of the right hand, computed without any CAD kernel
+
+Positions are in the coordinate system of the unrotated right hand, the case
+builders rotate them by ``handAngle`` and shift them by ``partXOffset``.
+``getSwitches`` applies that transform for both hands.
+
+With ``layoutBoard`` set, the positions are read from the switches of that
+KiCad board (see kicad.hand_points) instead of being computed from spacing and
+stagger, the outline is still computed.
+"""
+
+import math
+from typing import NamedTuple
+
+
+def getRowPos(params, rowOffset=0):
+    """ returns x y coordinate tuple for each right hand switch of the selected row
+
+    :param params: CaseParams
+    :param rowOffset: row number counted from the top
+    :return list of coordinate tuples
+    """
+    sx, sy, colStagger = params.spacing_x, params.spacing_y, params.colStagger
+
+    topSwitchY = params.caseHeight/2-params.wallWidth-sy/2-rowOffset*sy
+
+    points = [
+        ( 1.5 * sx, topSwitchY - 2 * colStagger ),
+        ( 2.5 * sx, topSwitchY - 1 * colStagger ),
+        ( 3.5 * sx, topSwitchY - 2 * colStagger ),
+    ]
+    if (rowOffset > 0):
+        points.append(( 4.5 * sx, topSwitchY - params.outerColStagger * colStagger ))
+
+    if (rowOffset < 2):
+        points.append(( 0.5 * sx, topSwitchY - 4 * colStagger ))
+    return points
+
+
+def getSwitchPositions(params, keys=True):
+    """ collects all positions for the first three rows
+
+    :param params: CaseParams
+    :param keys: if true returns alphakey positions, if false returns thumbkeyposition
+    :return list of coordinate tuples
+    """
+    if params.layoutBoard:
+        from .kicad import hand_points, load_board
+        alpha, thumb = hand_points(load_board(params.layoutBoard), params)
+        return alpha if keys else thumb
+    if keys:
+        return getRowPos(params, 0) + getRowPos(params, 1) + getRowPos(params, 2)
+    else:
+        sy = params.spacing_y
+        return [( 0.25 * params.spacing_x,
+                  params.caseHeight/2-params.wallWidth-sy/2-2*sy - 4 * params.colStagger )]
+
+
+def getAlphaKeyPos(params):
+    return getSwitchPositions(params, True)
+
+
+def getThumbKeyPos(params):
+    return getSwitchPositions(params, False)
+
+
+def getAllKeyPos(params):
+    return getAlphaKeyPos(params) + getThumbKeyPos(params)
+
+
+def getAllKeyPosMir(params):
+    return [(-x, y) for x, y in getAllKeyPos(params)]
+
+## ------------------------------------------------------------------------------
+
+class Switch(NamedTuple):
+    x: float          # center in case coordinates
+    y: float
+    angle: float      # rotation in degrees
+    hand: str         # "right" or "left"
+    thumb: bool
+
+
+def placeSwitch(params, pnt, mirrored=False):
+    """ transforms a right hand layout point into case coordinates, the same
+    way the hand work planes of the case builders do
+
+    :param pnt: x y tuple as returned by getRowPos
+    :param mirrored: place the point on the left hand
+    :return (x, y, angle) tuple
+    """
+    angle = -params.handAngle if mirrored else params.handAngle
+    x0 = -params.partXOffset if mirrored else params.partXOffset
+    x, y = (-pnt[0], pnt[1]) if mirrored else pnt
+    a = math.radians(angle)
+    return (x0 + x*math.cos(a) - y*math.sin(a), x*math.sin(a) + y*math.cos(a), angle)
+
+
+def getSwitches(params):
+    """ returns all switches of both hands in case coordinates
+
+    :param params: CaseParams
+    :return list of Switch, right hand first
+    """
+    alpha, thumb = getAlphaKeyPos(params), getThumbKeyPos(params)
+    switches = []
+    for hand, mirrored in (("right", False), ("left", True)):
+        for pnts, isThumb in ((alpha, False), (thumb, True)):
+            for pnt in pnts:
+                switches.append(Switch(*placeSwitch(params, pnt, mirrored), hand, isThumb))
+    return switches
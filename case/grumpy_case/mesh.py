@@ -0,0 +1,59 @@
+""" triangle meshes of built parts
+
+The full case is symmetric to the YZ plane, so for mesh output only the right
+half has to be tessellated. ``export_stl_mirrored`` cuts the finished part at
+X=0, tessellates the right half once and writes every triangle together with
+its mirror image. Seam vertices are snapped to X=0, so both halves share them
+exactly and the mesh stays watertight.
+"""
+
+import time
+from pathlib import Path
+
+from .export import DEFAULT_PROFILE, ExportReport, deflection, iter_triangles, write_stl_stream
+from .profiling import stage
+
+SEAM_EPS = 1e-6
+
+
+def mirror_triangles(triangles, eps=SEAM_EPS):
+    """ mirrors triangles of the right half at the YZ plane
+
+    Vertices within eps of the seam are snapped to X=0, triangles of the cut
+    face are dropped and the winding of the mirrored ones is reversed.
+
+    :param triangles: iterable of (a, b, c) vertex tuples of the right half
+    :return iterator of the triangles of both halves
+    """
+    for tri in triangles:
+        tri = tuple((0.0, y, z) if abs(x) <= eps else (x, y, z) for x, y, z in tri)
+        if tri[0][0] == tri[1][0] == tri[2][0] == 0.0:
+            # part of the cut face
+            continue
+        a, b, c = tri
+        yield a, b, c
+        yield tuple((-x, y, z) for x, y, z in (a, c, b))
+
+
+def right_half(part):
+    """ cuts a part at the YZ plane and returns the X >= 0 side """
+    from build123d import Compound, Keep, Plane
+
+    half = part.split(Plane.YZ, keep=Keep.TOP)
+    # depending on the build123d version several solids come back as a list
+    return Compound(list(half)) if isinstance(half, list) else half
+
+
+def export_stl_mirrored(part, path, profile=DEFAULT_PROFILE, parallel=True):
+    """ writes the STL of a YZ symmetric part, tessellating only one half
+
+    :param profile: name in export.PROFILES or (linear, angular) deflection
+    :return ExportReport
+    """
+    start = time.perf_counter()
+    tolerance, angular = deflection(profile)
+    with stage("export", part, file=Path(path).name, mirrored=True):
+        half = right_half(part)
+        count = write_stl_stream(path, mirror_triangles(iter_triangles(half, tolerance, angular, parallel)))
+    return ExportReport(str(path), "stl", profile if isinstance(profile, str) else str(profile),
+                        count, time.perf_counter() - start, Path(path).stat().st_size)
@@ -0,0 +1,76 @@
+""" builds the Bottom, Plate and Top bands in separate processes
+
+The bands only depend on the parameters until they are merged into the case
+half. Each one is built by its own Python process and handed back as a binary
+BREP file, the parent reads them and merges them as usual. The workers are
+started as ``python -m grumpy_case.parallel``, so scripts and notebook cells
+calling ``build_case(params, parallel=True)`` need no ``__main__`` guard.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .brep import read_brep, write_brep
+from .params import CaseParams
+
+BANDS = ("Bottom", "Plate", "Top")
+
+# directory containing the grumpy_case package
+_ROOT = Path(__file__).resolve().parent.parent
+
+
+def build_bands(params, names=BANDS, timeout=None):
+    """ builds stages in one worker process each
+
+    :param params: CaseParams
+    :param names: stages to build, any of BANDS
+    :param timeout: seconds to wait for all workers together, None waits
+        forever, subprocess.TimeoutExpired after that
+    :return dict stage name -> shape
+    """
+    env = dict(os.environ, GRUMPY_HEADLESS="1")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_ROOT), env.get("PYTHONPATH")]))
+
+    with tempfile.TemporaryDirectory(prefix="grumpy-bands-") as tmp:
+        tmp = Path(tmp)
+        paramsFile = tmp / "params.json"
+        paramsFile.write_text(json.dumps(params.to_dict(), default=list))
+
+        procs = {}
+        try:
+            for name in names:
+                cmd = [sys.executable, "-m", "grumpy_case.parallel", name, str(paramsFile), str(tmp / f"{name}.brep")]
+                procs[name] = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for name, proc in procs.items():
+                left = None if deadline is None else max(0, deadline - time.monotonic())
+                _, err = proc.communicate(timeout=left)
+                if proc.returncode:
+                    raise RuntimeError(f"building {name} failed:\n{err.decode(errors='replace')}")
+        finally:
+            for proc in procs.values():
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+
+        return {name: read_brep(tmp / f"{name}.brep") for name in names}
+
+
+def main(argv=None):
+    """ worker entry point: <stage> <params.json> <out.brep> """
+    from .build import StageRunner
+
+    name, paramsFile, out = argv if argv is not None else sys.argv[1:]
+    if name not in BANDS:
+        raise SystemExit(f"unknown band {name}")
+    params = CaseParams.from_dict(json.loads(Path(paramsFile).read_text()))
+    write_brep(StageRunner(params).get(name), out)
+
+
+if __name__ == "__main__":
+    main()
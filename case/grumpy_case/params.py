@@ -0,0 +1,192 @@
+""" parameter sets for the grumpy case variants
+
+All dimensions are in mm, angles in degrees. A ``CaseParams`` is frozen, so it
+can be shared between builds and used as a dictionary key. Derived values that
+the scripts used to compute at module level are exposed as properties.
+"""
+
+import dataclasses
+from dataclasses import dataclass
+
+# build fidelities, from fastest to complete
+FIDELITIES = ("draft", "standard", "production")
+
+
+@dataclass(frozen=True)
+class CaseParams:
+    name: str = "mx"
+
+    # CONSTANTS
+    spacing_x: float = 19.05     # key spacing in X (19.05 MX, 18 choc)
+    spacing_y: float = 19.05     # key spacing in Y (19.05 MX, 17 choc)
+    holeSize: float = 14         # Platehole size
+    holeFillet: float = 0        # corner radius of plate holes, 0 for sharp corners
+    pcbThickness: float = 1.6    # PCB Thickness
+    hsThickness: float = 1.85    # HS Socket Thickness below PCB
+    hsSafety: float = 1          # extra space to hide HS Sockets
+
+    # CASE PARAMETERS
+    keySafety: float = 0.5       # extra space between keycap and case
+    plateHeight: float = 5 - 0.25  # heigth of plate (minus space between PCB and plate)
+    plateClipHeight: float = 1.5   # switch clipping (1.2 for choc, 1.5 for MX)
+    clipCutout: tuple = (5, 14 + 2)  # size of the switch clip pockets below the plate
+    stagger: float = 0.25        # stagger between cols as a fraction of spacing_y
+    outerColStagger: float = 4   # stagger of the outer bottom key in colStagger units
+    layoutBoard: str = None      # .kicad_pcb the switch positions are taken from, None to compute them
+
+    heightAbovePlate: float = 8.5  # height of case rim measured from plate
+
+    outerRad: float = 5          # radius of outer edge fillets
+    outerRadSmall: float = 1.5   # radius of other outline fillets
+
+    wallWidth: float = 7.5       # Wall Width (in effect only left and right)
+    lWallWidth: float = 3        # min Wallthickness for keys outside of case body
+
+    handAngle: float = 14        # degrees of rotation for each hand
+    partXOffset: float = 4.33    # X offset of each hand from the center
+    centerNotch: tuple = (-21.2, 5)  # position of the middle cutout of the outline sketch
+    centerInset: float = 2       # how much lower the inner cutout should be
+
+    # MIRROR SEAM / TOP FINISH
+    seamSplitY: float = -25      # Y below which the seam is only filleted at top and bottom
+    seamFillet: float = 1        # radius of the fillets on the mirrored edges
+    seamBottomFillet: float = 2  # radius of the bottom fillet near the thumbs
+    grooveOffset: float = 33     # Y translation of the top groove
+    grooveVertical: bool = False  # fillet only the vertical groove edges
+    topOuterChamfer: float = 1   # chamfer of the top outline, 0 to disable
+    topInnerChamfer: float = 0.5  # chamfer of the keycap cutout, 0 to disable
+    insetChamfer: float = 0.5    # chamfer of the lowered middle cutout
+    bottomChamfer: float = 0.7   # chamfer of the bottom rim, 0 to disable
+
+    # USB CUTOUT
+    usbStraightExtra: float = 0  # extra Y length of cutout, if the inner cutout should be straight
+    usbZOffset: float = 0        # Z offset of the cutout relative to the PCB top
+    usbInnerSize: tuple = (10, 5)
+    usbInnerFillet: float = 1.5
+    usbInnerDepth: float = 5
+    usbInnerChamfer: float = 0.75  # 0 to disable
+    usbOuterSize: tuple = (12.5, 10.5)
+    usbOuterFillet: float = 2.5
+    usbOuterChamfer: float = 0.75  # 0 to disable
+
+    # BOTTOM
+    bottomStyle: str = "open"    # "open", "inset" (plate inside the rim) or "plate" (separate bottom part)
+    bottomPlateInset: float = 0.2  # gap between rim and inset bottom plate
+    bottom_part_thickness: float = 0  # height of the rim removed and added back by the bottom part
+
+    # BUILD
+    fidelity: str = "production"  # "draft" (no fillets/chamfers), "standard" (no chamfers) or "production"
+    cleanup: bool = False        # merge coplanar faces and heal every stage result, see heal.py
+    singleExtrude: bool = False  # extrude the outline once and cut the bands instead of building Bottom, Plate and Top
+
+    # DERIVED VALUES
+
+    @property
+    def colStagger(self):
+        return self.stagger * self.spacing_y
+
+    @property
+    def heightBelowPlate(self):
+        """ height of rim hiding pcb and Sockets """
+        return self.pcbThickness + self.hsThickness + self.hsSafety
+
+    @property
+    def overallHeight(self):
+        return self.heightAbovePlate + self.heightBelowPlate + self.plateHeight
+
+    @property
+    def caseWidth(self):
+        """ absolute case width """
+        return 10 * self.spacing_x + 2 * self.wallWidth
+
+    @property
+    def caseHeight(self):
+        """ absolute case height """
+        return 3 * self.spacing_y + 2 * self.wallWidth + 3 * self.colStagger
+
+    @property
+    def fillets(self):
+        """ build the finishing fillets (outerRadSmall, seam, groove) """
+        return self.fidelity != "draft"
+
+    @property
+    def chamfers(self):
+        """ build the finishing chamfers """
+        return self.fidelity == "production"
+
+    def replace(self, **changes):
+        """ returns a copy with the given fields changed """
+        return dataclasses.replace(self, **changes)
+
+    def to_dict(self):
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data, base=None):
+        """ creates params from a (json) dict, missing fields are taken from base
+
+        :param data: mapping of field names to values
+        :param base: CaseParams or preset name used for missing fields
+        :return CaseParams
+        """
+        if isinstance(base, str):
+            base = PRESETS[base]
+        base = base or cls()
+        fields = {f.name: f for f in dataclasses.fields(cls)}
+        unknown = set(data) - set(fields)
+        if unknown:
+            raise ValueError(f"unknown case parameters: {', '.join(sorted(unknown))}")
+        changes = {k: tuple(v) if isinstance(v, list) else v for k, v in data.items()}
+        return dataclasses.replace(base, **changes)
+
+
+## ------------------------------------------------------------------------------
+
+# MX Xiao-Version, open bottom
+MX = CaseParams()
+
+# MX/ChocV2 CH552T-Version, low profile w/ bottom plate
+LP = CaseParams(
+    name="lp",
+    holeSize=13.9,
+    hsThickness=3.3 - 1.6,
+    hsSafety=0.3,
+    plateHeight=2.2 - 0.1,
+    plateClipHeight=1.2,
+    clipCutout=(13.9 + 2, 13.9),
+    outerColStagger=3.5,
+    heightAbovePlate=8.5 - 6.6 + 3.5,
+    centerInset=1,
+    seamSplitY=-21,
+    topOuterChamfer=0,
+    topInnerChamfer=0,
+    usbStraightExtra=3,
+    usbInnerSize=(11.5, 6.5),
+    usbInnerDepth=11,
+    usbInnerChamfer=0,
+    usbOuterFillet=1.5,
+    bottomStyle="inset",
+)
+
+# ChocV1 Xiao-Version, choc spacing w/ separate bottom part
+CHOC = LP.replace(
+    name="choc",
+    spacing_x=18,
+    spacing_y=17,
+    holeFillet=1,
+    hsThickness=4.1 - 1.6,
+    hsSafety=0.5,
+    outerRadSmall=1.35,
+    handAngle=14.75,
+    partXOffset=4.05,
+    centerNotch=(-21.5, 7.3),
+    seamSplitY=-19,
+    grooveVertical=True,
+    bottomChamfer=0,
+    usbZOffset=-0.4,
+    usbOuterFillet=2,
+    bottomStyle="plate",
+    bottom_part_thickness=2,
+)
+
+PRESETS = {p.name: p for p in (MX, LP, CHOC)}
@@ -0,0 +1,142 @@
+""" 2D plate files (DXF, SVG) straight from the switch layout
+
+Nothing here imports a CAD kernel, a plate file for laser cutting or CNC is
+written in milliseconds.
+
+Usage: ``python -m grumpy_case.plate2d choc -o plate.dxf [--clips]``
+"""
+
+import argparse
+import math
+from pathlib import Path
+
+from .layout import getSwitches
+from .params import PRESETS
+
+# bulge of a 90 degree counter clockwise arc, see the DXF POLYLINE reference
+BULGE_90 = math.tan(math.radians(90) / 4)
+
+
+def roundedRect(width, height, radius=0):
+    """ outline of a centered rectangle with rounded corners
+
+    :return list of (x, y, bulge), counter clockwise. A bulge != 0 describes an
+        arc from this vertex to the next one.
+    """
+    w, h = width/2, height/2
+    r = min(radius, w, h)
+    if r <= 0:
+        return [(-w, -h, 0), (w, -h, 0), (w, h, 0), (-w, h, 0)]
+    return [
+        (-w+r, -h, 0), (w-r, -h, BULGE_90),
+        (w, -h+r, 0), (w, h-r, BULGE_90),
+        (w-r, h, 0), (-w+r, h, BULGE_90),
+        (-w, h-r, 0), (-w, -h+r, BULGE_90),
+    ]
+
+
+def place(outline, switch):
+    """ rotates and moves an outline to the position of a switch """
+    a = math.radians(switch.angle)
+    c, s = math.cos(a), math.sin(a)
+    return [(switch.x + x*c - y*s, switch.y + x*s + y*c, b) for x, y, b in outline]
+
+
+def plateOutlines(params, clips=False):
+    """ switch hole (and optionally clip pocket) outlines of both hands
+
+    :param params: CaseParams
+    :param clips: also return the clip pockets below the plate
+    :return dict layer name -> list of outlines, see roundedRect
+    """
+    hole = roundedRect(params.holeSize, params.holeSize, params.holeFillet)
+    switches = getSwitches(params)
+    layers = {"HOLES": [place(hole, sw) for sw in switches]}
+    if clips:
+        clip = roundedRect(*params.clipCutout, params.holeFillet)
+        layers["CLIPS"] = [place(clip, sw) for sw in switches]
+    return layers
+
+## ------------------------------------------------------------------------------
+
+def toDXF(layers):
+    """ renders outlines as closed R12 POLYLINE entities, in mm (R12 has no
+    unit header variable, importers have to be set to mm)
+
+    :param layers: dict layer name -> list of outlines
+    :return DXF file content
+    """
+    out = ["0", "SECTION", "2", "HEADER", "9", "$ACADVER", "1", "AC1009", "0", "ENDSEC",
+           "0", "SECTION", "2", "ENTITIES"]
+    for layer, outlines in layers.items():
+        for outline in outlines:
+            out += ["0", "POLYLINE", "8", layer, "66", "1", "70", "1"]
+            for x, y, b in outline:
+                out += ["0", "VERTEX", "8", layer, "10", f"{x:.6f}", "20", f"{y:.6f}"]
+                if b:
+                    out += ["42", f"{b:.9f}"]
+            out += ["0", "SEQEND", "8", layer]
+    out += ["0", "ENDSEC", "0", "EOF"]
+    return "\n".join(out) + "\n"
+
+
+def toSVG(layers, margin=5):
+    """ renders outlines as SVG paths, 1 user unit = 1 mm
+
+    :param layers: dict layer name -> list of outlines
+    :return SVG file content
+    """
+    pnts = [(x, y) for outlines in layers.values() for o in outlines for x, y, _ in o]
+    minX = min(x for x, _ in pnts) - margin
+    maxX = max(x for x, _ in pnts) + margin
+    minY = min(y for _, y in pnts) - margin
+    maxY = max(y for _, y in pnts) + margin
+    w, h = maxX-minX, maxY-minY
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{w:.3f}mm" height="{h:.3f}mm" '
+           f'viewBox="{minX:.3f} {-maxY:.3f} {w:.3f} {h:.3f}">',
+           # svg y points down, flip it so the file matches the case coordinates
+           '<g transform="scale(1,-1)" fill="none" stroke="black" stroke-width="0.1">']
+    for layer, outlines in layers.items():
+        out.append(f'<g id="{layer}">')
+        for outline in outlines:
+            d = [f"M{outline[0][0]:.4f},{outline[0][1]:.4f}"]
+            for i, (x, y, b) in enumerate(outline):
+                nx, ny, _ = outline[(i+1) % len(outline)]
+                if b:
+                    theta = 4*math.atan(b)
+                    r = math.hypot(nx-x, ny-y) / (2*math.sin(theta/2))
+                    d.append(f"A{abs(r):.4f},{abs(r):.4f} 0 0 {1 if b > 0 else 0} {nx:.4f},{ny:.4f}")
+                else:
+                    d.append(f"L{nx:.4f},{ny:.4f}")
+            out.append(f'<path d="{" ".join(d)} Z"/>')
+        out.append("</g>")
+    out += ["</g>", "</svg>"]
+    return "\n".join(out) + "\n"
+
+
+def export_plate(params, path, clips=False):
+    """ writes the plate outlines, format by file extension (.dxf or .svg) """
+    path = Path(path)
+    layers = plateOutlines(params, clips)
+    if path.suffix.lower() == ".dxf":
+        path.write_text(toDXF(layers))
+    elif path.suffix.lower() == ".svg":
+        path.write_text(toSVG(layers))
+    else:
+        raise ValueError(f"unsupported plate format {path.suffix}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="write switch plate outlines as DXF or SVG")
+    parser.add_argument("preset", choices=sorted(PRESETS))
+    parser.add_argument("-o", "--out", required=True, help="output file (.dxf or .svg)")
+    parser.add_argument("--clips", action="store_true", help="add the clip pockets on layer CLIPS")
+    args = parser.parse_args(argv)
+    if Path(args.out).suffix.lower() not in (".dxf", ".svg"):
+        parser.error(f"unsupported plate format {Path(args.out).suffix or args.out}, use .dxf or .svg")
+    export_plate(PRESETS[args.preset], args.out, args.clips)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+""" per stage timing of case builds
+
+The build functions mark their stages with ``stage(name, shape)``. This is a
+no-op unless a ``Profiler`` is active::
+
+    with Profiler() as prof:
+        build_case(CHOC)
+    prof.write_trace("choc.trace.json")   # open in chrome://tracing or perfetto
+
+Usage: ``python -m grumpy_case.profiling choc --trace choc.trace.json``
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_active = contextvars.ContextVar("grumpy_case_profiler", default=None)
+
+
+def _rss():
+    """ current resident set size in bytes """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _peak_rss():
+    """ peak resident set size of the process in bytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _topology(target):
+    """ face and edge count of a shape or of the current part of a builder """
+    shape = getattr(target, "part", target)
+    if shape is None:
+        return None
+    try:
+        return {"faces": len(shape.faces()), "edges": len(shape.edges())}
+    except Exception:
+        return None
+
+
+class Profiler:
+    def __init__(self, topology=True, listener=None):
+        """
+        :param topology: count faces and edges before and after each stage,
+            costs a topology walk per stage
+        :param listener: called with every finished stage record, e.g. to
+            stream progress
+        """
+        self.topology = topology
+        self.listener = listener
+        self.records = []
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _active.reset(self._token)
+
+    @contextmanager
+    def stage(self, name, target=None, **meta):
+        record = {"name": name, "depth": sum(1 for r in self.records if "end" not in r), **meta}
+        if self.topology and target is not None:
+            record["before"] = _topology(target)
+        record["start"] = time.perf_counter() - self._t0
+        record["tid"] = threading.get_ident()
+        self.records.append(record)
+        try:
+            yield record
+        finally:
+            record["end"] = time.perf_counter() - self._t0
+            record["seconds"] = record["end"] - record["start"]
+            record["rss"] = _rss()
+            record["peakRss"] = _peak_rss()
+            # stages may hand their result to the record instead of passing a target
+            result = record.pop("result", target)
+            if self.topology and result is not None:
+                record["after"] = _topology(result)
+            if self.listener is not None:
+                self.listener(record)
+
+    def report(self):
+        """ returns the stage records and the total time per stage name """
+        totals = {}
+        for r in self.records:
+            totals[r["name"]] = totals.get(r["name"], 0) + r.get("seconds", 0)
+        return {"stages": self.records, "totals": totals, "peakRss": _peak_rss()}
+
+    def write_json(self, path):
+        Path(path).write_text(json.dumps(self.report(), indent=2))
+
+    def write_trace(self, path):
+        """ writes the stages in chrome trace event format """
+        pid = os.getpid()
+        events = []
+        for r in self.records:
+            args = {k: v for k, v in r.items() if k not in ("name", "start", "end", "tid", "depth")}
+            events.append({
+                "name": r["name"], "ph": "X", "pid": pid, "tid": r["tid"],
+                "ts": r["start"] * 1e6, "dur": r.get("seconds", 0) * 1e6, "args": args,
+            })
+        Path(path).write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+    def summary(self):
+        lines = []
+        for r in self.records:
+            topo = ""
+            if r.get("before") and r.get("after"):
+                topo = (f"  faces {r['before']['faces']}->{r['after']['faces']}"
+                        f"  edges {r['before']['edges']}->{r['after']['edges']}")
+            lines.append(f"{'  ' * r['depth']}{r['name']:<{24 - 2 * r['depth']}} "
+                         f"{r.get('seconds', 0):8.3f}s  {r.get('rss', 0) / 2**20:7.1f}MB{topo}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def stage(name, target=None, **meta):
+    """ marks a build stage for the active profiler
+
+    :param name: stage name
+    :param target: shape or builder whose topology is counted before and after
+    :return context manager yielding the stage record, or None without an
+        active profiler
+    """
+    profiler = _active.get()
+    if profiler is None:
+        yield None
+        return
+    with profiler.stage(name, target, **meta) as record:
+        yield record
+
+
+def main(argv=None):
+    from .params import FIDELITIES, PRESETS, CaseParams
+
+    parser = argparse.ArgumentParser(description="profile the build stages of a case variant")
+    parser.add_argument("preset", choices=sorted(PRESETS))
+    parser.add_argument("--params", help="json file with parameter changes")
+    parser.add_argument("--fidelity", choices=FIDELITIES, help="override the build fidelity")
+    parser.add_argument("--cleanup", action="store_true", help="unify and heal every stage result")
+    parser.add_argument("--parallel", action="store_true", help="build the bands in worker processes")
+    parser.add_argument("--json", help="write the report as json")
+    parser.add_argument("--trace", help="write a chrome trace")
+    parser.add_argument("--export", help="export directory, profiles the export stage as well")
+    args = parser.parse_args(argv)
+
+    params = PRESETS[args.preset]
+    if args.params:
+        params = CaseParams.from_dict(json.loads(Path(args.params).read_text()), params)
+    if args.fidelity:
+        params = params.replace(fidelity=args.fidelity)
+    if args.cleanup:
+        params = params.replace(cleanup=True)
+
+    from .build import build_case
+    with Profiler() as prof:
+        case = build_case(params, parallel=args.parallel)
+        if args.export:
+            from .batch import export_parts
+            export_parts(case, args.export)
+
+    print(prof.summary())
+    if args.json:
+        prof.write_json(args.json)
+    if args.trace:
+        prof.write_trace(args.trace)
+
+
+if __name__ == "__main__":
+    main()
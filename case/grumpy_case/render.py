@@ -0,0 +1,204 @@
+""" headless PNG thumbnails of cases
+
+Parts are tessellated coarsely and rasterized with a NumPy z-buffer, no GPU,
+display or viewer is needed. Triangles are rasterized in chunks: the pixels
+of every triangle's bounding box are tested against its edge functions at
+once, the nearest fragment per pixel wins. The image is rendered at
+SUPERSAMPLE times the size and averaged down for smooth edges.
+
+Besides ``png`` / ``png:<view>`` outputs of batch, watch and the daemon (see
+batch.export_parts), STL files can be rendered in a process pool::
+
+    python -m grumpy_case.render out/*/case.stl --view iso top -j 8
+"""
+
+import argparse
+import math
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .export import ExportReport, iter_triangles
+
+# name -> (rotation around Z, elevation of the camera) in degrees
+VIEWS = {
+    "iso": (-30, 40),
+    "top": (0, 90),
+    "front": (0, 0),
+    "side": (-90, 0),
+}
+DEFAULT_VIEW = "iso"
+SIZE = 512
+SUPERSAMPLE = 2
+# tessellation of the thumbnails, a pixel is about 0.4mm at SIZE
+DEFLECTION = (0.2, 0.8)
+COLOR = (150, 158, 172)
+# light direction in camera coordinates (x right, y up, z towards the camera)
+LIGHT = (-0.4, 0.5, 1.0)
+AMBIENT = 0.3
+# candidate pixels per rasterization chunk
+CHUNK = 4_000_000
+
+
+def shape_triangles(shape, deflection=DEFLECTION):
+    """ :return float array (N, 3, 3) of a build123d shape """
+    return np.array(list(iter_triangles(shape, *deflection)), dtype=np.float64).reshape(-1, 3, 3)
+
+
+def _camera(view):
+    """ rotation of world into camera coordinates """
+    azimuth, elevation = VIEWS[view] if isinstance(view, str) else view
+    a, e = math.radians(azimuth), math.radians(elevation)
+    rz = np.array(((math.cos(a), -math.sin(a), 0), (math.sin(a), math.cos(a), 0), (0, 0, 1)))
+    # elevation 0 looks along +Y at the front, 90 looks down
+    rx = np.array(((1, 0, 0), (0, math.sin(e), math.cos(e)), (0, -math.cos(e), math.sin(e))))
+    return rx @ rz
+
+
+def rasterize(tris, view=DEFAULT_VIEW, size=SIZE, color=COLOR):
+    """ renders triangles orthographically, fitted into a square image
+
+    :param tris: (N, 3, 3) triangles
+    :param view: name in VIEWS or (azimuth, elevation)
+    :param color: RGB of a fully lit face
+    :return RGBA uint8 array (size, size, 4), transparent background
+    """
+    full = size * SUPERSAMPLE
+    cam = tris.reshape(-1, 3) @ _camera(view).T
+    lo, hi = cam.min(0), cam.max(0)
+    scale = 0.92 * full / max(hi[0] - lo[0], hi[1] - lo[1], 1e-9)
+    center = (lo + hi) / 2
+    x = ((cam[:, 0] - center[0]) * scale + full / 2).reshape(-1, 3)
+    y = ((center[1] - cam[:, 1]) * scale + full / 2).reshape(-1, 3)
+    z = cam[:, 2].reshape(-1, 3)
+
+    # flat shading
+    v = cam.reshape(-1, 3, 3)
+    n = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    n = n / np.maximum(np.linalg.norm(n, axis=1), 1e-300)[:, None]
+    light = np.asarray(LIGHT) / np.linalg.norm(LIGHT)
+    shade = AMBIENT + (1 - AMBIENT) * np.clip(n @ light, 0, 1)
+
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+    x0 = np.clip(np.floor(x.min(1)), 0, full - 1).astype(int)
+    x1 = np.clip(np.ceil(x.max(1)), 0, full - 1).astype(int)
+    y0 = np.clip(np.floor(y.min(1)), 0, full - 1).astype(int)
+    y1 = np.clip(np.ceil(y.max(1)), 0, full - 1).astype(int)
+    # the meshes are closed and counter clockwise from outside, faces turned
+    # away are hidden (clockwise on screen, as screen Y points down)
+    keep = area < -1e-12
+    w, h = x1 - x0 + 1, y1 - y0 + 1
+    count = np.where(keep, w * h, 0)
+
+    zbuf = np.full(full * full, -np.inf)
+    image = np.zeros(full * full)
+    ends = np.cumsum(count)
+    start = 0
+    while start < len(tris):
+        # triangles whose candidate pixels fit into one chunk, at least one
+        stop = max(int(np.searchsorted(ends, ends[start] - count[start] + CHUNK, "right")), start + 1)
+        t = np.arange(start, stop)
+        t = t[count[t] > 0]
+        start = stop
+        if not len(t):
+            continue
+        tri = np.repeat(t, count[t])
+        local = np.arange(len(tri)) - np.repeat(np.cumsum(count[t]) - count[t], count[t])
+        px = x0[tri] + local % w[tri]
+        py = y0[tri] + local // w[tri]
+        cx, cy = px + 0.5, py + 0.5
+
+        # barycentric coordinates from the edge functions
+        xs, ys = x[tri], y[tri]
+        b0 = ((xs[:, 1] - cx) * (ys[:, 2] - cy) - (xs[:, 2] - cx) * (ys[:, 1] - cy)) / area[tri]
+        b1 = ((xs[:, 2] - cx) * (ys[:, 0] - cy) - (xs[:, 0] - cx) * (ys[:, 2] - cy)) / area[tri]
+        b2 = 1 - b0 - b1
+        inside = (b0 >= -1e-9) & (b1 >= -1e-9) & (b2 >= -1e-9)
+        tri, b0, b1, b2 = tri[inside], b0[inside], b1[inside], b2[inside]
+        flat = (py * full + px)[inside]
+        depth = b0 * z[tri, 0] + b1 * z[tri, 1] + b2 * z[tri, 2]
+
+        # nearest fragment per pixel of this chunk, then against the buffer
+        order = np.lexsort((-depth, flat))
+        flat, depth, tri = flat[order], depth[order], tri[order]
+        first = np.r_[True, flat[1:] != flat[:-1]]
+        flat, depth, tri = flat[first], depth[first], tri[first]
+        closer = depth > zbuf[flat]
+        zbuf[flat[closer]] = depth[closer]
+        image[flat[closer]] = shade[tri[closer]]
+
+    covered = np.isfinite(zbuf)
+    rgba = np.zeros((full * full, 4))
+    rgba[:, :3] = image[:, None] * np.asarray(color, dtype=np.float64)
+    rgba[:, 3] = covered * 255
+    rgba = rgba.reshape(size, SUPERSAMPLE, size, SUPERSAMPLE, 4)
+    # average the color of the covered samples only, the alpha of all
+    alpha = rgba[..., 3].mean((1, 3))
+    weight = np.maximum(rgba[..., 3].sum((1, 3)), 1e-9)
+    rgb = (rgba[..., :3] * rgba[..., 3:]).sum((1, 3)) / weight[..., None]
+    return np.dstack([rgb, alpha]).round().astype(np.uint8)
+
+
+def write_png(path, rgba):
+    """ writes an RGBA uint8 array (h, w, 4) as PNG """
+    h, w, _ = rgba.shape
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # filter type 0 in front of every row
+    raw = np.concatenate([np.zeros((h, 1), np.uint8), rgba.reshape(h, -1)], axis=1).tobytes()
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def export_png(part, path, view=DEFAULT_VIEW, size=SIZE):
+    """ renders a build123d shape or (N, 3, 3) triangles into a PNG
+
+    :return ExportReport, profile is the view
+    """
+    start = time.perf_counter()
+    tris = part if isinstance(part, np.ndarray) else shape_triangles(part)
+    write_png(path, rasterize(tris, view, size))
+    return ExportReport(str(path), "png", view if isinstance(view, str) else str(view),
+                        len(tris), time.perf_counter() - start, Path(path).stat().st_size)
+
+## ------------------------------------------------------------------------------
+
+def _render_stl(path, views, size, outDir):
+    from .interference import load_stl
+
+    path = Path(path)
+    tris = load_stl(path)
+    target = Path(outDir) if outDir else path.parent
+    return [export_png(tris, target / f"{path.stem}-{view}.png", view, size) for view in views]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="render STL files into PNG thumbnails")
+    parser.add_argument("stl", nargs="+", help="binary STL files")
+    parser.add_argument("--view", nargs="+", default=[DEFAULT_VIEW], choices=sorted(VIEWS))
+    parser.add_argument("--size", type=int, default=SIZE, help="width and height in pixels")
+    parser.add_argument("-o", "--out", default=None, help="output directory, default next to the STL")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    args = parser.parse_args(argv)
+
+    if args.out:
+        Path(args.out).mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.jobs or os.cpu_count()) as pool:
+        futures = [pool.submit(_render_stl, path, args.view, args.size, args.out) for path in args.stl]
+        count = sum(len(future.result()) for future in futures)
+    print(f"{count} thumbnails in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
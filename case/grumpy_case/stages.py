@@ -0,0 +1,108 @@
+""" stages of the case build and the parameters each of them reads
+
+Kept free of kernel imports, so keys for cached stages can be computed
+without loading build123d.
+"""
+
+import hashlib
+import json
+
+# mixed into every stage key, bump it whenever a change to build.py or the
+# helpers it calls moves geometry, so cached stages of older code are not reused
+PIPELINE_VERSION = 1
+
+# fields read by getRowPos/getSwitchPositions
+LAYOUT = ("spacing_x", "spacing_y", "stagger", "outerColStagger", "wallWidth", "layoutBoard")
+# fields of the (filleted) case outline sketch
+OUTLINE = LAYOUT + ("lWallWidth", "handAngle", "partXOffset", "centerNotch", "outerRad")
+# fields of heightBelowPlate
+BELOW = ("pcbThickness", "hsThickness", "hsSafety")
+# fields read by build_sketches, all part stages use the sketches
+SKETCHES = OUTLINE + (
+    "keySafety", "usbInnerSize", "usbStraightExtra", "usbInnerFillet", "usbOuterSize",
+    "usbOuterFillet", "bottomStyle", "outerRadSmall", "fidelity")
+
+# fields read by the stage runner for every stage
+RUNNER = ("cleanup",)
+
+# stage -> (upstream stages, parameter fields read by the stage itself)
+STAGES = {
+    "Bottom": ((), OUTLINE + BELOW + ("outerRadSmall", "fidelity")),
+    "Plate": ((), OUTLINE + BELOW + (
+        "plateHeight", "plateClipHeight", "clipCutout", "holeSize", "holeFillet",
+        "outerRadSmall", "fidelity")),
+    "Top": ((), OUTLINE + BELOW + (
+        "plateHeight", "heightAbovePlate", "keySafety", "centerInset", "outerRadSmall", "fidelity")),
+    "CaseHalf": (("Bottom", "Plate", "Top"), ("singleExtrude",)),
+    "CaseFull": (("CaseHalf",), BELOW + (
+        "centerInset", "outerRadSmall",
+        "seamSplitY", "seamFillet", "seamBottomFillet", "grooveOffset", "grooveVertical",
+        "topOuterChamfer", "topInnerChamfer", "insetChamfer", "bottomChamfer",
+        "bottom_part_thickness", "usbStraightExtra", "usbZOffset", "usbInnerSize",
+        "usbInnerFillet", "usbInnerDepth", "usbInnerChamfer", "usbOuterSize",
+        "usbOuterFillet", "usbOuterChamfer", "fidelity")),
+    "BottomPlate": (("CaseFull",), LAYOUT + (
+        "handAngle", "partXOffset", "hsThickness", "bottomStyle", "bottomPlateInset",
+        "bottom_part_thickness")),
+}
+
+
+def stage_inputs(name, params):
+    """ upstream stages a stage is actually built from, with ``singleExtrude``
+    the half is built directly from the sketches, at production fidelity it
+    needs the exact shell of Bottom
+
+    stage_keys chains the STAGES upstream keys regardless, so the key of the
+    half still covers every field of the three bands.
+    """
+    if name == "CaseHalf" and params.singleExtrude:
+        return ("Bottom",) if params.fidelity == "production" else ()
+    return STAGES[name][0]
+
+
+def _values(params, fields):
+    """ field values the keys are computed from, a layout board by its content """
+    values = {f: getattr(params, f) for f in fields}
+    if values.get("layoutBoard"):
+        from .kicad import board_sha256
+        values["layoutBoard"] = board_sha256(values["layoutBoard"])
+    return values
+
+
+def stage_keys(params, salt=""):
+    """ content keys of all stages, a key changes only if one of the fields of
+    the stage or of an upstream stage, or PIPELINE_VERSION changes
+
+    :param params: CaseParams
+    :param salt: extra string mixed into every key, e.g. the CAD library version
+    :return dict stage name -> hex digest
+    """
+    keys = {}
+    values = _values(params, {f for _, fields in STAGES.values() for f in fields + RUNNER})
+    for name, (upstream, fields) in STAGES.items():
+        data = {
+            "stage": name,
+            "salt": salt,
+            "pipeline": PIPELINE_VERSION,
+            "upstream": [keys[u] for u in upstream],
+            "params": {f: values[f] for f in fields + RUNNER},
+        }
+        blob = json.dumps(data, sort_keys=True, default=list).encode()
+        keys[name] = hashlib.sha256(blob).hexdigest()
+    return keys
+
+
+def dirty_stages(old, new, salt=""):
+    """ stages that have to be rebuilt after changing params from old to new
+
+    :param old: CaseParams of the last build, None for a first build
+    :param new: CaseParams
+    :return set of stage names, contains "sketches" if the sketches changed
+    """
+    if old is None:
+        return {"sketches", *STAGES}
+    oldKeys, newKeys = stage_keys(old, salt), stage_keys(new, salt)
+    dirty = {name for name in STAGES if oldKeys[name] != newKeys[name]}
+    if _values(old, SKETCHES) != _values(new, SKETCHES):
+        dirty.add("sketches")
+    return dirty
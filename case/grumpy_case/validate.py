@@ -0,0 +1,231 @@
+""" feasibility checks of a parameter set, without any CAD kernel
+
+Catches the parameter combinations that otherwise fail deep inside OCC:
+fillets larger than the edges they round, walls that vanish when key
+spacing, wall width and key safety interact, overlapping switch holes and a
+USB cutout reaching the top. Takes about a millisecond per variant, seconds
+before the kernel would fail.
+
+Usage: ``python -m grumpy_case.validate choc [--params changes.json]``
+"""
+
+import argparse
+import json
+import math
+from itertools import combinations
+from pathlib import Path
+
+from .layout import getRowPos, getSwitches
+from .params import FIDELITIES, PRESETS, CaseParams
+
+# thinnest wall or web between cutouts that is still built reliably (mm)
+MIN_WALL = 0.8
+
+
+class InfeasibleParams(ValueError):
+    def __init__(self, params, reasons):
+        self.params = params
+        self.reasons = reasons
+        super().__init__(f"infeasible parameters for {params.name}: " + "; ".join(reasons))
+
+
+def _rect(x, y, w, h, angle):
+    """ corners of a rotated rectangle, counter clockwise """
+    a = math.radians(angle)
+    c, s = math.cos(a), math.sin(a)
+    return [(x + dx*c - dy*s, y + dx*s + dy*c)
+            for dx, dy in ((-w/2, -h/2), (w/2, -h/2), (w/2, h/2), (-w/2, h/2))]
+
+
+def _separation(a, b):
+    """ largest gap of two convex polygons along their edge normals
+
+    Negative if they overlap, otherwise a lower bound of their distance
+    (separating axis theorem).
+    """
+    sep = -math.inf
+    for poly in (a, b):
+        for i in range(len(poly)):
+            (x1, y1), (x2, y2) = poly[i], poly[(i+1) % len(poly)]
+            length = math.hypot(x2-x1, y2-y1)
+            nx, ny = (y1-y2)/length, (x2-x1)/length
+            pa = [nx*x + ny*y for x, y in a]
+            pb = [nx*x + ny*y for x, y in b]
+            sep = max(sep, min(pb) - max(pa), min(pa) - max(pb))
+    return sep
+
+
+def _segmentDist(p, a, b):
+    ax, ay = a
+    dx, dy = b[0]-ax, b[1]-ay
+    t = ((p[0]-ax)*dx + (p[1]-ay)*dy) / (dx*dx + dy*dy)
+    t = max(0, min(1, t))
+    return math.hypot(p[0] - ax - t*dx, p[1] - ay - t*dy)
+
+
+def polygonGap(a, b):
+    """ distance between two convex polygons, 0 if they overlap """
+    if _separation(a, b) <= 0:
+        return 0
+    gap = math.inf
+    for p, q in ((a, b), (b, a)):
+        for pnt in p:
+            for i in range(len(q)):
+                gap = min(gap, _segmentDist(pnt, q[i], q[(i+1) % len(q)]))
+    return gap
+
+
+def minCutoutGap(switches, width, height, limit):
+    """ smallest distance between two equal cutouts placed at all switches
+
+    Only pairs which may be closer than limit are measured.
+
+    :param switches: list of Switch, see getSwitches
+    :return (gap, switch a, switch b), gap is inf if no pair is closer than limit
+    """
+    reach = math.hypot(width, height) + limit
+    best = (math.inf, None, None)
+    for a, b in combinations(switches, 2):
+        # the cutouts can't be closer than their circumscribed circles
+        if math.hypot(a.x - b.x, a.y - b.y) >= reach:
+            continue
+        ra, rb = _rect(a.x, a.y, width, height, a.angle), _rect(b.x, b.y, width, height, b.angle)
+        if _separation(ra, rb) >= limit:
+            continue
+        gap = polygonGap(ra, rb)
+        if gap < min(best[0], limit):
+            best = (gap, a, b)
+    return best
+
+
+def staggerSteps(params):
+    """ non zero Y steps between the outlines of neighbouring columns """
+    steps = set()
+    for row in range(3):
+        pnts = sorted(getRowPos(params, row))
+        for (x1, y1), (x2, y2) in zip(pnts, pnts[1:]):
+            if abs(y1-y2) > 1e-9:
+                steps.add(abs(y1-y2))
+    return sorted(steps)
+
+
+def check(params):
+    """ checks a parameter set
+
+    :param params: CaseParams
+    :return list of reasons, empty if the variant looks buildable
+    """
+    p = params
+    reasons = []
+
+    def require(ok, reason):
+        if not ok:
+            reasons.append(reason)
+
+    # plain ranges
+    for name in ("spacing_x", "spacing_y", "holeSize", "plateHeight", "heightAbovePlate",
+                 "wallWidth", "lWallWidth", "pcbThickness", "hsThickness"):
+        require(getattr(p, name) > 0, f"{name} must be positive")
+    for name in ("keySafety", "holeFillet", "outerRad", "outerRadSmall", "centerInset",
+                 "bottom_part_thickness", "bottomPlateInset", "hsSafety"):
+        require(getattr(p, name) >= 0, f"{name} must not be negative")
+    require(p.heightBelowPlate > 0,
+            f"heightBelowPlate {p.heightBelowPlate:.2f} (pcbThickness + hsThickness + hsSafety) "
+            f"must be positive")
+    require(p.fidelity in FIDELITIES, f"fidelity must be one of {', '.join(FIDELITIES)}")
+    require(p.bottomStyle in ("open", "inset", "plate"), "bottomStyle must be open, inset or plate")
+    require(p.layoutBoard is None or Path(p.layoutBoard).is_file(),
+            f"layoutBoard {p.layoutBoard} is not a file")
+    if reasons:
+        return reasons
+
+    # switch holes and clip pockets
+    require(0 < p.plateClipHeight < p.plateHeight,
+            f"plateClipHeight {p.plateClipHeight} must be between 0 and plateHeight {p.plateHeight}")
+    require(2*p.holeFillet <= p.holeSize,
+            f"holeFillet {p.holeFillet} exceeds half the hole size {p.holeSize}")
+    require(2*p.holeFillet <= min(p.clipCutout),
+            f"holeFillet {p.holeFillet} exceeds half the clip cutout {min(p.clipCutout)}")
+    switches = getSwitches(p)
+    gap, a, b = minCutoutGap(switches, p.holeSize, p.holeSize, MIN_WALL)
+    if a is not None:
+        reasons.append(f"switch holes at ({a.x:.1f}, {a.y:.1f}) and ({b.x:.1f}, {b.y:.1f}) leave a "
+                       f"{gap:.2f}mm web, at least {MIN_WALL}mm needed")
+    gap, a, b = minCutoutGap(switches, *p.clipCutout, 1e-9)
+    if a is not None:
+        reasons.append(f"clip pockets at ({a.x:.1f}, {a.y:.1f}) and ({b.x:.1f}, {b.y:.1f}) overlap")
+
+    # walls of the rim
+    rim = p.lWallWidth - p.keySafety/2
+    require(rim >= MIN_WALL,
+            f"rim around the keycaps is {rim:.2f}mm (lWallWidth - keySafety/2), "
+            f"at least {MIN_WALL}mm needed")
+    require(rim > p.topOuterChamfer + p.topInnerChamfer,
+            f"top chamfers ({p.topOuterChamfer} + {p.topInnerChamfer}) are wider than the {rim:.2f}mm rim")
+    require(p.lWallWidth > p.bottomChamfer,
+            f"bottomChamfer {p.bottomChamfer} is wider than the {p.lWallWidth}mm wall")
+    require(p.spacing_x + 2*p.lWallWidth - p.holeSize > 2*MIN_WALL,
+            "plate between switch hole and outline is too thin")
+
+    # fillets of the outline
+    outerEdge = 2*p.spacing_y + 2*p.wallWidth + 2.5 + 10
+    require(2*p.outerRad < outerEdge,
+            f"outerRad {p.outerRad} is too big for the {outerEdge:.2f}mm outer edge")
+    if p.fidelity != "draft":
+        steps = staggerSteps(p)
+        require(not steps or 2*p.outerRadSmall <= steps[0],
+                f"outerRadSmall {p.outerRadSmall} does not fit the {steps[0] if steps else 0:.2f}mm "
+                f"column stagger step")
+
+    # heights
+    require(p.centerInset < p.heightAbovePlate,
+            f"centerInset {p.centerInset} cuts through the {p.heightAbovePlate}mm top rim")
+    require(p.insetChamfer < p.centerInset or p.fidelity != "production" or not p.insetChamfer,
+            f"insetChamfer {p.insetChamfer} is deeper than centerInset {p.centerInset}")
+    require(p.bottom_part_thickness < p.heightBelowPlate,
+            f"bottom_part_thickness {p.bottom_part_thickness} removes the whole "
+            f"{p.heightBelowPlate:.2f}mm bottom rim")
+
+    # usb cutout, centered on the plate underside plus usbZOffset
+    w, h = p.usbInnerSize
+    require(2*p.usbInnerFillet <= min(w, h + p.usbStraightExtra),
+            f"usbInnerFillet {p.usbInnerFillet} exceeds half the inner usb cutout")
+    require(2*p.usbOuterFillet <= min(p.usbOuterSize),
+            f"usbOuterFillet {p.usbOuterFillet} exceeds half the outer usb cutout")
+    # the inner cutout may open the bottom (usbStraightExtra), but must not reach
+    # the lowered middle part of the top
+    usbTop = p.heightBelowPlate + p.usbZOffset + h/2
+    ceiling = p.overallHeight - p.centerInset
+    require(usbTop < ceiling - MIN_WALL,
+            f"usb cutout reaches z={usbTop:.2f}, less than {MIN_WALL}mm below the "
+            f"middle cutout at z={ceiling:.2f}")
+    return reasons
+
+
+def validate(params):
+    """ raises InfeasibleParams with all reasons if check finds any """
+    reasons = check(params)
+    if reasons:
+        raise InfeasibleParams(params, reasons)
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="check a case parameter set without building it")
+    parser.add_argument("preset", choices=sorted(PRESETS))
+    parser.add_argument("--params", help="json file with parameter changes")
+    args = parser.parse_args(argv)
+
+    params = PRESETS[args.preset]
+    if args.params:
+        params = CaseParams.from_dict(json.loads(Path(args.params).read_text()), params)
+    reasons = check(params)
+    for reason in reasons:
+        print(reason)
+    if reasons:
+        raise SystemExit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
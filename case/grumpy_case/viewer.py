@@ -0,0 +1,78 @@
+""" optional ocp_vscode viewer
+
+``ocp_vscode`` is only imported on the first ``show``/``show_object`` call.
+With ``GRUMPY_HEADLESS=1`` set, or when the viewer package is not installed,
+both are no-ops, so headless build nodes never load it or try to connect.
+"""
+
+import os
+import warnings
+
+_settings = {"port": 3939, "defaults": {}}
+_viewer = None
+_disabled = False
+
+
+def headless():
+    return _disabled or os.environ.get("GRUMPY_HEADLESS", "").lower() not in ("", "0", "false", "no")
+
+
+def configure(port=3939, **defaults):
+    """ stores viewer settings, applied when the viewer is first used
+
+    :param port: ocp_vscode port
+    :param defaults: passed to ocp_vscode.set_defaults, enum values of
+        ocp_vscode (e.g. reset_camera) may be given by name ("KEEP")
+    """
+    _settings["port"] = port
+    _settings["defaults"] = defaults
+    if _viewer is not None:
+        _apply(_viewer)
+
+
+def _apply(viewer):
+    viewer.set_port(_settings["port"])
+    defaults = dict(_settings["defaults"])
+    if isinstance(defaults.get("reset_camera"), str):
+        defaults["reset_camera"] = getattr(viewer.Camera, defaults["reset_camera"])
+    if defaults:
+        viewer.set_defaults(**defaults)
+
+
+def _load():
+    global _viewer, _disabled
+    if _viewer is None and not headless():
+        try:
+            import ocp_vscode
+        except ImportError:
+            _disabled = True
+            return None
+        _apply(ocp_vscode)
+        _viewer = ocp_vscode
+    return _viewer
+
+
+def _call(name, *objs, **kwargs):
+    global _disabled
+    viewer = _load()
+    if viewer is None:
+        return None
+    try:
+        return getattr(viewer, name)(*objs, **kwargs)
+    except Exception as e:
+        # no viewer listening, stop trying for the rest of the run
+        _disabled = True
+        warnings.warn(f"viewer unavailable, display disabled: {e}")
+        return None
+
+
+def show(*objs, **kwargs):
+    return _call("show", *[o for o in objs if o is not None], **kwargs)
+
+
+def show_object(obj, name=None, **kwargs):
+    if obj is None:
+        return None
+    if name is not None:
+        kwargs["name"] = name
+    return _call("show_object", obj, **kwargs)
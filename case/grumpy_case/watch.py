@@ -0,0 +1,149 @@
+""" rebuilds the case whenever its parameter file changes
+
+The parameter file is a json object of CaseParams fields, ``base`` selects the
+preset the missing fields are taken from::
+
+    {"base": "choc", "bottom_part_thickness": 2, "usbStraightExtra": 1}
+
+Only the stages reading a changed field, and the stages downstream of them,
+are rebuilt (see ``stages.STAGES``). Exports are rewritten only for parts that
+changed and the result is sent to the viewer unless running headless.
+
+Usage: ``python -m grumpy_case.watch params.json [-o out/] [--format stl:draft]``
+"""
+
+import argparse
+import json
+import time
+import traceback
+from pathlib import Path
+
+from .export import parse_output
+from .params import CaseParams
+from .profiling import Profiler
+from .stages import dirty_stages
+from .validate import validate
+
+# exported part -> stages it depends on
+PART_STAGES = {"case": "CaseFull", "bottom": "BottomPlate"}
+
+
+def load_params(path):
+    """ reads a parameter file, see module docstring
+
+    :return CaseParams
+    """
+    data = json.loads(Path(path).read_text())
+    base = data.pop("base", "mx")
+    return CaseParams.from_dict(data, base)
+
+
+class Watcher:
+    def __init__(self, path, outDir=None, formats=("step",), cache=None, show=True):
+        """
+        :param path: parameter file
+        :param outDir: export directory, nothing is exported if None
+        :param formats: output specs, see batch.export_parts
+        :param cache: optional BuildCache shared with other runs
+        :param show: send rebuilt parts to the viewer
+        """
+        self.path = Path(path)
+        self.outDir = outDir
+        self.formats = formats
+        self.cache = cache
+        self.show = show
+        self.runner = None
+        self._mtime = None
+
+    def changed(self):
+        """ true if the parameter file was modified since the last check """
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        return True
+
+    def rebuild(self):
+        """ loads the parameter file and rebuilds the dirty stages
+
+        :return set of rebuilt stage names, None if the parameters are invalid
+        """
+        from .build import StageRunner
+        from .batch import export_parts
+
+        try:
+            params = validate(load_params(self.path))
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"invalid parameters in {self.path}: {e}")
+            return None
+
+        if self.runner is None:
+            self.runner = StageRunner(params, self.cache)
+            dirty = dirty_stages(None, params)
+        else:
+            dirty = self.runner.update(params)
+        if not dirty:
+            print("no stage affected")
+            return dirty
+
+        with Profiler(topology=False) as prof:
+            case = self.runner.case()
+        print(prof.summary())
+
+        parts = {part for part, name in PART_STAGES.items() if name in dirty}
+        if self.outDir is not None and parts:
+            for report in export_parts(case, self.outDir, self.formats, only=parts):
+                print(f"wrote {report['path']} ({report['seconds']:.2f}s)")
+        if self.show:
+            from .viewer import show
+            show(case.full, case.bottomPlate)
+        return dirty
+
+    def run(self, interval=0.5):
+        """ polls the parameter file and rebuilds on every change, until interrupted """
+        print(f"watching {self.path}")
+        while True:
+            if self.changed():
+                try:
+                    self.rebuild()
+                except Exception:
+                    # keep watching, the next save may fix it
+                    traceback.print_exc()
+            time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="rebuild the case whenever a parameter file changes")
+    parser.add_argument("params", help="parameter file (json)")
+    parser.add_argument("-o", "--out", default=None, help="export directory")
+    parser.add_argument("--format", action="append", help="output spec, e.g. step or stl:draft (repeatable)")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between checks")
+    parser.add_argument("--cache", action="store_true", help="also use the persistent build cache")
+    parser.add_argument("--once", action="store_true", help="build once and exit")
+    args = parser.parse_args(argv)
+    for spec in args.format or ():
+        try:
+            parse_output(spec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    cache = None
+    if args.cache:
+        from .cache import BuildCache
+        cache = BuildCache()
+    watcher = Watcher(args.params, args.out, args.format or ["step"], cache)
+    if args.once:
+        watcher.changed()
+        watcher.rebuild()
+        return
+    try:
+        watcher.run(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+""" process pool with a deadline per job, enforced by the parent
+
+A fillet or boolean stuck inside OCC never returns to the Python interpreter,
+so signals or timeouts inside the worker can't stop it. Here every worker is
+a process of its own, the parent kills one whose job runs past its deadline
+(or notices it died) and starts a fresh one, the other workers and queued
+jobs are not affected.
+"""
+
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class WorkerDied(Exception):
+    pass
+
+
+def _serve(conn, initializer, initargs):
+    """ worker loop, runs (fn, args) tuples until it receives None """
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = ("ok", fn(*args))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except Exception:
+            # result or exception can't be pickled
+            conn.send(("error", RuntimeError(f"{type(reply[1]).__name__}: {reply[1]}")))
+
+
+class _Worker:
+    def __init__(self, ctx, initializer, initargs):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_serve, args=(child, initializer, initargs), daemon=True)
+        self.process.start()
+        child.close()
+        self.future = None
+        self.deadline = None
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool:
+    def __init__(self, workers, initializer=None, initargs=(), mp_context=None):
+        """
+        :param workers: number of worker processes
+        :param initializer: called with initargs in every new worker
+        :param mp_context: multiprocessing context, default the platform default
+        """
+        self._ctx = mp_context or multiprocessing.get_context()
+        self._init = (initializer, initargs)
+        self._workers = [_Worker(self._ctx, *self._init) for _ in range(workers)]
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args, timeout=None):
+        """ queues fn(*args) for a worker
+
+        :param timeout: seconds the job may run once a worker picked it up,
+            None for no limit
+        :return Future, failing with JobTimeout or WorkerDied if the worker
+            was killed or crashed
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("pool is shut down")
+            self._pending.append((future, fn, args, timeout))
+        return future
+
+    def _replace(self, worker, error):
+        worker.kill()
+        if worker.future is not None:
+            worker.future.set_exception(error)
+        self._workers[self._workers.index(worker)] = _Worker(self._ctx, *self._init)
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                for i, worker in enumerate(self._workers):
+                    while worker.future is None and self._pending:
+                        future, fn, args, timeout = self._pending.popleft()
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        try:
+                            worker.conn.send((fn, args))
+                        except OSError:
+                            # died while idle, e.g. in the initializer
+                            worker.future = future
+                            self._replace(worker, WorkerDied("worker process died"))
+                            worker = self._workers[i]
+                            continue
+                        except Exception as e:
+                            # fn or args can't be pickled, nothing was sent
+                            future.set_exception(e)
+                            continue
+                        worker.future = future
+                        worker.deadline = time.monotonic() + timeout if timeout else None
+
+            busy = [w for w in self._workers if w.future is not None]
+            deadlines = [w.deadline for w in busy if w.deadline is not None]
+            # short waits also pick up newly submitted jobs
+            timeout = min([0.1] + [max(d - time.monotonic(), 0) for d in deadlines])
+            ready = wait([w.conn for w in busy] + [w.process.sentinel for w in busy], timeout)
+
+            for worker in busy:
+                if worker.conn in ready:
+                    try:
+                        status, value = worker.conn.recv()
+                    except (EOFError, OSError):
+                        self._replace(worker, WorkerDied("worker process died"))
+                        continue
+                    future, worker.future = worker.future, None
+                    if status == "ok":
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                elif worker.process.sentinel in ready:
+                    self._replace(worker, WorkerDied("worker process died"))
+                elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                    self._replace(worker, JobTimeout("job exceeded its deadline"))
+
+    def shutdown(self):
+        """ stops all workers, running jobs are killed, queued ones cancelled """
+        with self._lock:
+            self._closed = True
+            pending, self._pending = self._pending, deque()
+        self._thread.join()
+        for future, *_ in pending:
+            future.cancel()
+        for worker in self._workers:
+            if worker.future is None:
+                try:
+                    worker.conn.send(None)
+                    worker.process.join(1)
+                except OSError:
+                    pass
+            else:
+                worker.future.set_exception(WorkerDied("pool shut down"))
+            worker.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
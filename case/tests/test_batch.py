@@ -0,0 +1,17 @@
+""" variants are validated before any worker is used, no CAD kernel needed """
+
+import json
+
+from grumpy_case.batch import expand_spec, run_batch
+
+
+def test_bad_grid_type_is_infeasible(tmp_path):
+    # the string is not a number, the second value fails validate.check
+    jobs = expand_spec({"base": "mx", "grid": {"keySafety": ["0.5", 50]}})
+    results = run_batch(jobs, tmp_path, formats=[], workers=1)
+
+    assert [r["status"] for r in results] == ["infeasible", "infeasible"]
+    assert results[0]["error"].startswith("invalid parameters:")
+    assert "rim around the keycaps" in results[1]["error"]
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert [v["name"] for v in manifest["variants"]] == [job.name for job in jobs]
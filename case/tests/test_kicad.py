@@ -0,0 +1,64 @@
+""" board parsing and the parsed board cache """
+
+import os
+import re
+import shutil
+from pathlib import Path
+
+import pytest
+
+from grumpy_case.kicad import load_board
+
+BOARD = Path(__file__).resolve().parent.parent.parent / "grumpy_choc" / "grumpy_choc.kicad_pcb"
+
+
+@pytest.fixture
+def board(tmp_path):
+    path = tmp_path / "board.kicad_pcb"
+    shutil.copy(BOARD, path)
+    return path
+
+
+def test_switches(board):
+    parsed = load_board(board, None)
+    assert len(parsed.switches) == 28
+    assert parsed.edges
+
+
+def test_truncated_cache_is_a_miss(board, tmp_path):
+    cacheDir = tmp_path / "cache"
+    expected = load_board(board, cacheDir)
+    cached, = cacheDir.glob("*.bin")
+    data = cached.read_bytes()
+    # cut into the values, not the header
+    cached.write_bytes(data[:-8])
+
+    assert load_board(board, cacheDir) == expected
+    # the broken entry is replaced
+    assert cached.read_bytes() == data
+
+
+def test_unwritable_cache_dir(board, tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    assert load_board(board, blocker / "cache").switches == load_board(board, None).switches
+
+
+def test_cache_follows_content(board, tmp_path):
+    """ same size and modification time, e.g. after cp -p """
+    cacheDir = tmp_path / "cache"
+    before = load_board(board, cacheDir)
+    st = board.stat()
+
+    text = board.read_text()
+    # move the first switch by changing one digit of its X coordinate
+    m = re.search(r'\(footprint "[^"]*Hotswap[^"]*"[^(]*(?:\([^()]*\)\s*)*?\(at (\d+\.\d)', text)
+    digit = m.end(1) - 1
+    text = text[:digit] + str((int(text[digit]) + 1) % 10) + text[digit + 1:]
+    board.write_text(text)
+    os.utime(board, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert board.stat().st_size == st.st_size
+
+    after = load_board(board, cacheDir)
+    assert after.sha256 != before.sha256
+    assert after.switches != before.switches
@@ -0,0 +1,66 @@
+""" deadlines and crashes of the worker pool """
+
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from grumpy_case.workers import JobTimeout, WorkerDied, WorkerPool
+
+CTX = multiprocessing.get_context("fork")
+
+
+def double(x):
+    return x * 2
+
+
+def hang(seconds):
+    time.sleep(seconds)
+
+
+def crash():
+    os._exit(1)
+
+
+def fail():
+    raise ValueError("boom")
+
+
+def die():
+    raise SystemExit(3)
+
+
+def test_hung_worker_is_replaced():
+    with WorkerPool(1, mp_context=CTX) as pool:
+        start = time.monotonic()
+        hung = pool.submit(hang, 60, timeout=0.5)
+        after = pool.submit(double, 21)
+        with pytest.raises(JobTimeout):
+            hung.result(10)
+        assert after.result(10) == 42
+        assert time.monotonic() - start < 10
+
+
+def test_crash_and_errors():
+    with WorkerPool(2, mp_context=CTX) as pool:
+        crashed = pool.submit(crash)
+        failed = pool.submit(fail)
+        unpicklable = pool.submit(double, threading.Lock())
+        with pytest.raises(WorkerDied):
+            crashed.result(10)
+        with pytest.raises(ValueError, match="boom"):
+            failed.result(10)
+        with pytest.raises(TypeError):
+            unpicklable.result(10)
+        assert pool.submit(double, 2).result(10) == 4
+
+
+def test_failing_initializer():
+    with WorkerPool(1, die, mp_context=CTX) as pool:
+        time.sleep(0.2)
+        with pytest.raises(WorkerDied):
+            pool.submit(double, 1).result(10)
+        with pytest.raises(WorkerDied):
+            pool.submit(double, 1).result(10)